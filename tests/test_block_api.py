@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from server import BlockchainAPI
+
+
+@pytest.mark.parametrize("block", [{}, {"tx_count": 0}, {"tx_count": None}])
+def test_bad_tx_count_is_not_cached(block):
+    async def run():
+        api = BlockchainAPI()
+        responses = [block, {"tx_count": 7}]
+
+        async def fake_request(path, as_json=True):
+            return responses.pop(0)
+
+        api.request_any_host = fake_request
+        return [await api.get_block_tx_count("h") for _ in range(3)]
+
+    assert asyncio.run(run()) == [0, 7, 7]
+
+
+def test_failed_request_is_not_cached():
+    async def run():
+        api = BlockchainAPI()
+        calls = []
+
+        async def fake_request(path, as_json=True):
+            calls.append(path)
+            raise Exception("API error: 500")
+
+        api.request_any_host = fake_request
+        counts = [await api.get_block_tx_count("h") for _ in range(2)]
+        return counts, len(calls)
+
+    assert asyncio.run(run()) == ([0, 0], 2)
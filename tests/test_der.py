@@ -0,0 +1,90 @@
+import coincurve
+import pytest
+
+from server import parse_der_at, scan_der_signatures
+
+
+def der(r, s):
+    """DER-encode raw r/s INTEGER contents exactly as given (padding included)"""
+    body = bytes((0x02, len(r))) + r + bytes((0x02, len(s))) + s
+    return bytes((0x30, len(body))) + body
+
+
+def push(data):
+    return bytes((len(data),)) + data
+
+
+R32 = bytes.fromhex("6e" * 32)
+S32 = bytes.fromhex("4d" * 32)
+R_PADDED = b"\x00" + bytes.fromhex("8f" * 32)
+S_PADDED = b"\x00" + bytes.fromhex("a1" * 32)
+R_SHORT = bytes.fromhex("3c" * 31)
+
+
+@pytest.mark.parametrize("r, s", [
+    (R32, S32),
+    (R_PADDED, S32),
+    (R32, S_PADDED),
+    (R_PADDED, S_PADDED),
+    (R_SHORT, S32),
+    (R_SHORT, S_PADDED),
+])
+def test_common_shapes_parse(r, s):
+    assert parse_der_at(der(r, s), 0) == (r, s)
+
+
+def test_off_table_shape_parses_through_generic_path():
+    r, s = bytes.fromhex("11" * 20), bytes.fromhex("22" * 29)
+    assert parse_der_at(der(r, s), 0) == (r, s)
+
+
+def test_real_signature_parses():
+    private_key = coincurve.PrivateKey(bytes(31) + b"\x07")
+    signature = private_key.sign(b"reused r")
+    r, s = parse_der_at(signature, 0)
+    assert der(r, s) == signature
+
+
+@pytest.mark.parametrize("r, s", [(R32, S32), (R_PADDED, S_PADDED), (bytes.fromhex("11" * 20), S32)])
+def test_truncated_signature_is_rejected(r, s):
+    signature = der(r, s)
+    for cut in range(1, len(signature)):
+        assert parse_der_at(signature[:cut], 0) is None
+    assert scan_der_signatures(signature[:-1]) == []
+
+
+def test_non_sequence_lead_byte_is_rejected():
+    signature = der(R32, S32)
+    assert parse_der_at(b"\x31" + signature[1:], 0) is None
+
+
+def test_wrong_integer_tags_are_rejected():
+    signature = bytearray(der(R32, S32))
+    signature[2] = 0x03
+    assert parse_der_at(bytes(signature), 0) is None
+    signature = bytearray(der(R32, S32))
+    signature[4 + len(R32)] = 0x03
+    assert parse_der_at(bytes(signature), 0) is None
+
+
+def test_sequence_length_must_match_contents():
+    r, s = bytes.fromhex("11" * 20), bytes.fromhex("22" * 29)
+    signature = bytearray(der(r, s))
+    signature[1] += 1
+    assert parse_der_at(bytes(signature) + b"\x01", 0) is None
+
+
+def test_script_sig_sighash_byte_stays_outside_s():
+    pubkey = bytes.fromhex("02" + "30" * 32)  # 0x30 bytes inside the pubkey push must not match
+    signature = der(R_PADDED, S32)
+    script_sig = push(signature + b"\x01") + push(pubkey)
+    assert scan_der_signatures(script_sig) == [(1, R_PADDED, S32)]
+
+
+def test_multisig_script_sig_finds_every_signature():
+    first, second = der(R32, S_PADDED), der(R_SHORT, S32)
+    script_sig = b"\x00" + push(first + b"\x01") + push(second + b"\x83")
+    assert scan_der_signatures(script_sig) == [
+        (2, R32, S_PADDED),
+        (2 + len(first) + 2, R_SHORT, S32),
+    ]
@@ -0,0 +1,97 @@
+import random
+
+import coincurve
+import pytest
+
+import server
+from server import SECP256K1_G, SECP256K1_N, BitcoinCrypto
+
+_rng = random.Random(143)
+SCALARS = [1, 2, 3, 15, 16, 17, 255, 256, SECP256K1_N - 2, SECP256K1_N - 1] + [
+    _rng.randrange(1, SECP256K1_N) for _ in range(20)
+]
+
+
+def libsecp256k1_point(k):
+    return coincurve.PrivateKey(k.to_bytes(32, "big")).public_key.point()
+
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    """Force point_multiply off the coincurve fast path, with no cached window tables"""
+    monkeypatch.setattr(server, "coincurve", None)
+    monkeypatch.setattr(server, "_WINDOW_TABLES", {})
+
+
+@pytest.mark.parametrize("k", SCALARS)
+def test_fallback_generator_multiply_matches_libsecp256k1(pure_python, k):
+    assert BitcoinCrypto.point_multiply(k, SECP256K1_G) == libsecp256k1_point(k)
+
+
+def test_fallback_multiply_of_order_is_infinity(pure_python):
+    assert BitcoinCrypto.point_multiply(SECP256K1_N, SECP256K1_G) is None
+    assert BitcoinCrypto.point_multiply(0, SECP256K1_G) is None
+
+
+def test_fallback_multiply_of_non_generator_point(pure_python):
+    point = libsecp256k1_point(7)
+    assert BitcoinCrypto.point_multiply(3, point) == libsecp256k1_point(21)
+    assert BitcoinCrypto.point_multiply(SECP256K1_N - 1, point) == libsecp256k1_point(SECP256K1_N - 7)
+
+
+def test_jacobian_double_and_add_agree_with_affine():
+    p = libsecp256k1_point(5)
+    q = libsecp256k1_point(9)
+    # Any Z works: (X, Y, Z) = (x*Z^2, y*Z^3, Z)
+    z = 0x1234567
+    jp = (p[0] * z * z % server.SECP256K1_P, p[1] * z * z * z % server.SECP256K1_P, z)
+
+    def to_affine(point):
+        x, y, z = point
+        z_inv = pow(z, -1, server.SECP256K1_P)
+        return x * z_inv * z_inv % server.SECP256K1_P, y * z_inv ** 3 % server.SECP256K1_P
+
+    assert to_affine(BitcoinCrypto.jacobian_double(jp)) == libsecp256k1_point(10)
+    assert to_affine(BitcoinCrypto.jacobian_add_affine(jp, q)) == libsecp256k1_point(14)
+    assert to_affine(BitcoinCrypto.jacobian_add_affine(jp, p)) == libsecp256k1_point(10)
+    assert BitcoinCrypto.jacobian_add_affine(jp, libsecp256k1_point(SECP256K1_N - 5)) is None
+
+
+@pytest.fixture(params=["gmpy2", "int"])
+def fallback_backend(request, monkeypatch, pure_python):
+    """Run the pure-Python multiply on gmpy2 mpz coordinates and on plain ints"""
+    if request.param == "int":
+        monkeypatch.setattr(server, "gmpy2", None)
+    elif server.gmpy2 is None:
+        pytest.skip("gmpy2 is not installed")
+    BitcoinCrypto.private_key_int_addresses.cache_clear()
+    yield request.param
+    BitcoinCrypto.private_key_int_addresses.cache_clear()
+
+
+def libsecp256k1_addresses(k):
+    public_key = coincurve.PrivateKey(k.to_bytes(32, "big")).public_key
+    return (
+        BitcoinCrypto.public_key_to_address(public_key.format(compressed=True)),
+        BitcoinCrypto.public_key_to_address(public_key.format(compressed=False)),
+    )
+
+
+def test_fallback_addresses_for_key_one(fallback_backend):
+    assert BitcoinCrypto.private_key_int_addresses(1) == (
+        "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH",
+        "1EHNa6Q4Jz2uvNExL497mE43ikXhwF6kZm",
+    )
+
+
+@pytest.mark.parametrize("k", SCALARS)
+def test_fallback_addresses_match_libsecp256k1(fallback_backend, k):
+    assert BitcoinCrypto.private_key_int_addresses(k) == libsecp256k1_addresses(k)
+
+
+def test_fallback_returns_plain_ints_and_uses_the_selected_backend(fallback_backend):
+    x, y = BitcoinCrypto.point_multiply(SCALARS[-1], SECP256K1_G)
+    assert type(x) is int and type(y) is int
+    table = server._WINDOW_TABLES[(SECP256K1_G, server.SECP256K1_P)]
+    expected_type = type(server.gmpy2.mpz(0)) if fallback_backend == "gmpy2" else int
+    assert type(table[2][0]) is expected_type
@@ -0,0 +1,82 @@
+import random
+
+import coincurve
+import pytest
+
+from server import SECP256K1_N, BitcoinCrypto, recover_key_batch
+
+N = SECP256K1_N
+_rng = random.Random(2019)
+
+
+def sign(d, k, h):
+    """Textbook ECDSA (r, s) for private key d, nonce k and message hash h"""
+    r = coincurve.PrivateKey(k.to_bytes(32, "big")).public_key.point()[0] % N
+    s = pow(k, -1, N) * (h + r * d) % N
+    return r, s
+
+
+def reused_nonce_candidate(d, k):
+    """An (r, s1, s2, hash1, hash2) candidate from two signatures by d that share nonce k"""
+    h1, h2 = _rng.randrange(1, N), _rng.randrange(1, N)
+    r, s1 = sign(d, k, h1)
+    _, s2 = sign(d, k, h2)
+    return r, s1, s2, h1, h2
+
+
+KEYS = [_rng.randrange(1, N) for _ in range(6)]
+CANDIDATES = [reused_nonce_candidate(d, _rng.randrange(1, N)) for d in KEYS]
+
+
+def test_batch_of_one_recovers_key():
+    assert BitcoinCrypto.batch_recover_candidates(CANDIDATES[:1]) == KEYS[:1]
+
+
+def test_batch_recovers_every_key():
+    assert BitcoinCrypto.batch_recover_candidates(CANDIDATES) == KEYS
+
+
+def test_batch_matches_single_pair_recovery():
+    random_candidates = [tuple(_rng.randrange(1, N) for _ in range(5)) for _ in range(20)]
+    assert BitcoinCrypto.batch_recover_candidates(random_candidates) == [
+        BitcoinCrypto.recover_private_key_int(*candidate) for candidate in random_candidates
+    ]
+
+
+@pytest.mark.parametrize("position", [0, 2, 5])
+def test_zero_s_diff_inside_batch_is_skipped(position):
+    candidates = list(CANDIDATES)
+    r, s1, _, h1, h2 = candidates[position]
+    candidates[position] = (r, s1, s1, h1, h2)
+    expected = list(KEYS)
+    expected[position] = None
+    assert BitcoinCrypto.batch_recover_candidates(candidates) == expected
+
+
+def test_equal_hashes_and_zero_r_are_skipped():
+    r, s1, s2, h1, _ = CANDIDATES[1]
+    candidates = [CANDIDATES[0], (r, s1, s2, h1, h1), (0, s1, s2, h1, h1 + 1), CANDIDATES[2]]
+    assert BitcoinCrypto.batch_recover_candidates(candidates) == [KEYS[0], None, None, KEYS[2]]
+
+
+def test_batch_with_no_valid_candidates():
+    assert BitcoinCrypto.batch_recover_candidates([]) == []
+    assert BitcoinCrypto.batch_recover_candidates([(1, 5, 5, 7, 9)]) == [None]
+
+
+def test_recover_private_key_accepts_bytes_hex_and_int():
+    r, s1, s2, h1, h2 = CANDIDATES[0]
+    expected = f"{KEYS[0]:064x}"
+    assert BitcoinCrypto.recover_private_key(r, s1, s2, h1, h2) == expected
+    as_bytes = [value.to_bytes(32, "big") for value in (r, s1, s2, h1, h2)]
+    assert BitcoinCrypto.recover_private_key(*as_bytes) == expected
+    assert BitcoinCrypto.recover_private_key(*(value.hex() for value in as_bytes)) == expected
+
+
+def test_recover_key_batch_derives_addresses():
+    candidates = [CANDIDATES[0], (1, 5, 5, 7, 9), CANDIDATES[0]]
+    first, skipped, repeat = recover_key_batch(candidates)
+    assert skipped is None
+    assert first == repeat
+    assert first[0] == f"{KEYS[0]:064x}"
+    assert first[1:] == BitcoinCrypto.private_key_int_addresses(KEYS[0])
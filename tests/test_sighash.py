@@ -0,0 +1,137 @@
+import pytest
+
+from server import (
+    SIGHASH_ALL,
+    SIGHASH_ANYONECANPAY,
+    SIGHASH_NONE,
+    SIGHASH_SINGLE,
+    TxSighashCache,
+    segwit_v0_script_code,
+)
+
+
+def txid_field(display_hex):
+    """Esplora reports txids in display (byte-reversed) order"""
+    return bytes.fromhex(display_hex)[::-1].hex()
+
+
+# BIP-143 "Native P2WPKH" example: input 1 spends a P2WPKH output worth 6 BTC
+NATIVE_P2WPKH_TX = {
+    "txid": "bip143-native-p2wpkh",
+    "version": 1,
+    "locktime": 0x11,
+    "vin": [
+        {
+            "txid": txid_field("fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541db4e4ad969f"),
+            "vout": 0,
+            "sequence": 0xffffffee,
+            "prevout": {
+                "scriptpubkey": "2103c9f4836b9a4f77fc0d81f7bcb01b7f1b35916864b9476c241ce9fc198bd25432ac",
+                "scriptpubkey_type": "p2pk",
+                "value": 625000000,
+            },
+        },
+        {
+            "txid": txid_field("ef51e1b804cc89d182d279655c3aa89e815b1b309fe287d9b2b55d57b90ec68a"),
+            "vout": 1,
+            "sequence": 0xffffffff,
+            "prevout": {
+                "scriptpubkey": "00141d0f172a0ecb48aee1be1f2687d2963ae33f71a1",
+                "scriptpubkey_type": "v0_p2wpkh",
+                "value": 600000000,
+            },
+        },
+    ],
+    "vout": [
+        {"value": 112340000, "scriptpubkey": "76a9148280b37df378db99f66f85c95a783a76ac7a6d5988ac"},
+        {"value": 223450000, "scriptpubkey": "76a9143bde42dbee7e4dbe6a21b2d50ce2f0167faa815988ac"},
+    ],
+}
+
+# BIP-143 "P2SH-P2WSH" example: a 6-of-6 multisig signed once with every sighash type
+P2SH_P2WSH_WITNESS_SCRIPT = (
+    "56210307b8ae49ac90a048e9b53357a2354b3334e9c8bee813ecb98e99a7e07e8c3ba32103b28f0c28bfab54554ae8c658ac5c"
+    "3e0ce6e79ad336331f78c428dd43eea8449b21034b8113d703413d57761b8b9781957b8c0ac1dfe69f492580ca4195f50376ba4a"
+    "21033400f6afecb833092a9a21cfdf1ed1376e58c5d1f47de74683123987e967a8f42103a6d48b1131e94ba04d9737d61acdaa13"
+    "22008af9602b3b14862c07a1789aac162102d8b661b0b3302ee2f162b09e07a55ad5dfbe673a9f01d9f0c19617681024306b56ae"
+)
+P2SH_P2WSH_TX = {
+    "txid": "bip143-p2sh-p2wsh",
+    "version": 1,
+    "locktime": 0,
+    "vin": [
+        {
+            "txid": txid_field("36641869ca081e70f394c6948e8af409e18b619df2ed74aa106c1ca29787b96e"),
+            "vout": 1,
+            "sequence": 0xffffffff,
+            "scriptsig": "220020a16b5755f7f6f96dbd65f5f0d6ab9418b89af4b1f14a1bb8a09062c35f0dcb54",
+            "prevout": {
+                "scriptpubkey": "a9149993a429037b5d912407a71c252019287b8d27a587",
+                "scriptpubkey_type": "p2sh",
+                "value": 987654321,
+            },
+        },
+    ],
+    "vout": [
+        {"value": 900000000, "scriptpubkey": "76a914389ffce9cd9ae88dcc0631e88a821ffdbe9bfe2688ac"},
+        {"value": 87000000, "scriptpubkey": "76a9147480a33f950689af511e6e84c138dbbd3c3ee41588ac"},
+    ],
+}
+
+
+def test_native_p2wpkh_script_code():
+    script_code = segwit_v0_script_code(NATIVE_P2WPKH_TX["vin"][1], ["30", "02"])
+    assert script_code.hex() == "1976a9141d0f172a0ecb48aee1be1f2687d2963ae33f71a188ac"
+
+
+def test_native_p2wpkh_sighash_all():
+    script_code = segwit_v0_script_code(NATIVE_P2WPKH_TX["vin"][1], ["30", "02"])
+    digest = TxSighashCache().sighash(NATIVE_P2WPKH_TX, 1, script_code, SIGHASH_ALL)
+    assert digest.hex() == "c37af31116d1b27caf68aae9e3ac82f1477929014d5b917657d0eb49478cb670"
+
+
+def test_nested_p2wpkh_script_code():
+    vin = {
+        "scriptsig": "1600141d0f172a0ecb48aee1be1f2687d2963ae33f71a1",
+        "prevout": {"scriptpubkey": "a914" + "00" * 20 + "87", "scriptpubkey_type": "p2sh"},
+    }
+    script_code = segwit_v0_script_code(vin, ["30", "02"])
+    assert script_code.hex() == "1976a9141d0f172a0ecb48aee1be1f2687d2963ae33f71a188ac"
+
+
+def test_non_segwit_prevout_has_no_script_code():
+    assert segwit_v0_script_code(NATIVE_P2WPKH_TX["vin"][0], ["30", "02"]) is None
+
+
+@pytest.mark.parametrize("sighash_type, expected", [
+    (SIGHASH_ALL, "185c0be5263dce5b4bb50a047973c1b6272bfbd0103a89444597dc40b248ee7c"),
+    (SIGHASH_NONE, "e9733bc60ea13c95c6527066bb975a2ff29a925e80aa14c213f686cbae5d2f36"),
+    (SIGHASH_SINGLE, "1e1f1c303dc025bd664acb72e583e933fae4cff9148bf78c157d1e8f78530aea"),
+    (SIGHASH_ALL | SIGHASH_ANYONECANPAY, "2a67f03e63a6a422125878b40b82da593be8d4efaafe88ee528af6e5a9955c6e"),
+    (SIGHASH_NONE | SIGHASH_ANYONECANPAY, "781ba15f3779d5542ce8ecb5c18716733a5ee42a6f51488ec96154934e2c890a"),
+    (SIGHASH_SINGLE | SIGHASH_ANYONECANPAY, "511e8e52ed574121fc1b654970395502128263f62662e076dc6baf05c2e6a99b"),
+])
+def test_p2sh_p2wsh_sighash_types(sighash_type, expected):
+    vin = P2SH_P2WSH_TX["vin"][0]
+    script_code = segwit_v0_script_code(vin, ["", P2SH_P2WSH_WITNESS_SCRIPT])
+    assert TxSighashCache().sighash(P2SH_P2WSH_TX, 0, script_code, sighash_type).hex() == expected
+
+
+def test_cached_midstate_gives_same_digests():
+    """Every sighash type computed through one warm cache matches a cold cache"""
+    cache = TxSighashCache()
+    script_code = segwit_v0_script_code(P2SH_P2WSH_TX["vin"][0], ["", P2SH_P2WSH_WITNESS_SCRIPT])
+    types = [SIGHASH_ALL, SIGHASH_NONE, SIGHASH_SINGLE, 0x81, 0x82, 0x83]
+    warm = [cache.sighash(P2SH_P2WSH_TX, 0, script_code, t) for t in types]
+    cold = [TxSighashCache().sighash(P2SH_P2WSH_TX, 0, script_code, t) for t in types]
+    assert warm == cold
+
+
+def test_sighash_single_without_matching_output_hashes_zero_outputs():
+    tx = dict(NATIVE_P2WPKH_TX, txid="single-no-output", vout=NATIVE_P2WPKH_TX["vout"][:1])
+    script_code = segwit_v0_script_code(tx["vin"][1], ["30", "02"])
+    cache = TxSighashCache()
+    # Input 1 has no output 1, so SINGLE commits to a zero hashOutputs and ignores the outputs
+    assert cache.sighash(tx, 1, script_code, SIGHASH_SINGLE) == cache.sighash(
+        dict(tx, txid="single-no-output-2", vout=[]), 1, script_code, SIGHASH_SINGLE
+    )
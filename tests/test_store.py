@@ -0,0 +1,118 @@
+import asyncio
+import random
+
+import pytest
+
+from server import (
+    BLOOM_MAX_BITS_LOG2, BLOOM_MIN_BITS_LOG2, RBloomFilter, ScanState, SignatureStore, bloom_bits_log2,
+    scan_states, scanner,
+)
+
+_rng = random.Random(1009)
+
+
+def random_r():
+    return _rng.randbytes(32)
+
+
+@pytest.mark.parametrize("expected, bits_log2", [
+    (0, BLOOM_MIN_BITS_LOG2),
+    (1, BLOOM_MIN_BITS_LOG2),
+    (4096, 16),
+    (4097, 17),
+    (1_000_000, 24),
+    (10**9, BLOOM_MAX_BITS_LOG2),
+])
+def test_bloom_sizing(expected, bits_log2):
+    assert bloom_bits_log2(expected) == bits_log2
+
+
+def test_store_sizes_bloom_from_expected_rows():
+    store = SignatureStore(expected_rows=10)
+    try:
+        store.append(random_r(), random_r(), random_r(), random_r(), 0)
+        assert len(store._bloom.bits) == 1 << (BLOOM_MIN_BITS_LOG2 - 3)
+    finally:
+        store.close()
+
+
+def test_bloom_false_positive_rate_at_design_load():
+    expected = 4096
+    bloom = RBloomFilter(bloom_bits_log2(expected))
+    false_positives = sum(bloom.add(random_r()) for _ in range(expected))
+    assert false_positives / expected < 0.01
+    assert bloom.add(bytes(32)) is False
+    assert bloom.add(bytes(32)) is True
+
+
+def test_spill_round_trip():
+    store = SignatureStore(spill_rows=8, expected_rows=64)
+    rows = [(random_r(), random_r(), random_r(), random_r(), i) for i in range(20)]
+    try:
+        for r, s, h, tx, idx in rows:
+            store.append(r, s, h, tx, idx)
+            if store.should_spill():
+                store.spill()
+        assert len(store) == 4
+        for r, s, h, tx, idx in rows[:-1]:
+            found = store.first_row(r)
+            assert found is not None
+            assert found.s == int.from_bytes(s, "big")
+            assert found.message_hash == int.from_bytes(h, "big")
+            assert found.tx_id == tx
+            assert found.input_index == idx
+        assert store.first_row(random_r()) is None
+        # Re-adding a spilled R is caught by the filter, which outlives the spill
+        assert store.append(rows[0][0], random_r(), random_r(), random_r(), 99) is True
+    finally:
+        store.close()
+
+
+def test_txid_interning():
+    store = SignatureStore()
+    tx_a, tx_b = random_r(), random_r()
+    try:
+        for tx, idx in ((tx_a, 0), (tx_a, 1), (tx_a, 2), (tx_b, 0), (tx_a, 3)):
+            store.append(random_r(), random_r(), random_r(), tx, idx)
+        # Consecutive inputs of one transaction share a stored txid; a transaction seen again is stored again
+        assert len(store.tx_id) == 3 * 32
+        assert list(store.tx_ref) == [0, 0, 0, 1, 2]
+        assert [store.row(i).tx_id for i in range(5)] == [tx_a, tx_a, tx_a, tx_b, tx_a]
+        assert [store.row(i).input_index for i in range(5)] == [0, 1, 2, 0, 3]
+    finally:
+        store.close()
+
+
+def test_reused_r_split_across_spill_is_paired(monkeypatch):
+    monkeypatch.setitem(scan_states, "split", ScanState(config={}, current_block=0, total_blocks=1))
+    monkeypatch.setattr(scanner, "_log_buf", {})
+    store = SignatureStore(spill_rows=4, expected_rows=16)
+    pivots = {}
+    queue = asyncio.Queue()
+    reused_r = random_r()
+    tx_spilled, tx_memory = random_r(), random_r()
+    # The first use of R and its transaction's next input land in sqlite; the later uses stay in memory
+    rows = [
+        (reused_r, tx_spilled, 0),
+        (random_r(), tx_spilled, 1),
+        (random_r(), random_r(), 0),
+        (random_r(), random_r(), 0),
+        (random_r(), tx_memory, 0),
+        (reused_r, tx_memory, 1),
+        (reused_r, tx_memory, 2),
+    ]
+    try:
+        for r, tx, idx in rows:
+            if store.append(r, random_r(), random_r(), tx, idx):
+                scanner.queue_reused_r("split", store, pivots, queue, r)
+            if store.should_spill():
+                store.spill()
+        assert store._db is not None and len(store) == 3
+        pairs = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert [(r, pivot.tx_id, pivot.input_index) for r, pivot, _ in pairs] == [
+            (reused_r, tx_spilled, 0), (reused_r, tx_spilled, 0),
+        ]
+        assert [(row.tx_id, row.input_index) for _, _, row in pairs] == [(tx_memory, 1), (tx_memory, 2)]
+        assert scan_states["split"].r_reuse_pairs == 1
+    finally:
+        store.close()